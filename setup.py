@@ -15,5 +15,8 @@ setup(
     license='GNU General Public License',
     install_requires=[
         'bitarray'
-    ]
+    ],
+    extras_require={
+        'encryption': ['cryptography']
+    }
 )
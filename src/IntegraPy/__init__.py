@@ -6,32 +6,45 @@ Satel Integra and ETHM-1 modules
 '''
 import time
 import logging
-from datetime import datetime
-from struct import unpack
-from binascii import hexlify
-from socket import socket, AF_INET, SOCK_STREAM
+from binascii import unhexlify
 
 
-from .constants import HEADER, FOOTER, HARDWARE_MODEL, LANGUAGES
 from .framing import (
-    checksum, prepare_frame, parse_event, parse_name, set_bits_positions,
-    bytes_with_bits_set, format_user_code
+    checksum, prepare_frame, check_response, parse_event, parse_name,
+    set_bits_positions, bytes_with_bits_set, format_user_code
 )
+from .exceptions import (
+    IntegraError, IntegraConnectionError, IntegraTimeout, IntegraCancelled,
+    IntegraBusy, ProtocolError, ChecksumError, ResultError, CircuitOpen
+)
+from .transport import BlockingTransport, Deadline, log_frame
+from .clock import PanelClock
+from .health import HealthRegistry
+from .commands import COMMANDS
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
-def log_frame(msg, frame):
-    log.debug(
-        msg + '"{0}", length: {1}',
-        hexlify(frame),
-        len(frame)
-    )
+def _transport_option(name, doc):
+    # options moved to the transport, kept on Integra for compatibility
+    def get(self):
+        return getattr(self.transport, name)
+
+    def set(self, value):
+        setattr(self.transport, name, value)
+
+    return property(get, set, doc=doc)
 
 
 class Integra(object):
 
+    delay = _transport_option('delay', 'Delay between repetitions')
+    max_attempts = _transport_option('max_attempts', 'Maximum repetitions')
+    recorder = _transport_option(
+        'recorder', 'Optional FrameRecorder capturing raw frames'
+    )
+
     def __init__(
         self,
         user_code,
@@ -39,111 +52,84 @@ class Integra(object):
         port=7094,
         encoding='cp1250',
         delay=0.002,
-        max_attempts=3
+        max_attempts=3,
+        recorder=None,
+        clock_refresh=3600.0,
+        transport=None,
+        connect_timeout=5.0,
+        read_timeout=5.0,
+        timeout=None,
+        health=None,
+        integration_key=None
     ):
         self.host = host
         self.user_code = user_code
         self.port = port
         self.encoding = encoding
 
-        # Delay between commands
-        self.delay = delay
-        # Maximum repetitions
-        self.max_attempts = max_attempts
+        # Connection handling; blocking, connection per command by default,
+        # encrypted if the integration key is given (ETHM-1 Plus)
+        if transport is None:
+            transport_class, options = BlockingTransport, {}
+            if integration_key is not None:
+                from .encryption import EncryptedTransport
+
+                transport_class = EncryptedTransport
+                options['integration_key'] = integration_key
+            transport = transport_class(
+                host,
+                port,
+                # Delay between commands
+                delay=delay,
+                # Maximum repetitions
+                max_attempts=max_attempts,
+                recorder=recorder,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                # Deadline of a whole command, including repetitions
+                timeout=timeout,
+                **options
+            )
+        self.transport = transport
+        # Optional HealthRegistry; fails fast when the panel is down
+        if health is not None:
+            self.transport = health.guard(self.transport)
         # Name cache
         # Keys: (kind, number)
         # Values: NameRecords
         self._name_cache = {}
+        # Panel time tracked locally; answers get_event's year
+        self.clock = PanelClock(self, clock_refresh)
 
-    def run_command(self, cmd):
-        command = prepare_frame(cmd)
-        log_frame('Sending command: ', command)
-
-        for attempt in range(self.max_attempts):
-            sock = socket(AF_INET, SOCK_STREAM)
-            sock.connect((self.host, self.port))
-
-            if not sock.send(command):
-                raise Exception("Error sending frame.")
-
-            resp = bytearray(sock.recv(100))
-            log_frame('Response received: ', resp)
-            sock.close()
-
-            # integra will respond "Busy!" if it gets next message too early
-            if (resp[0:8] == b'\x10\x42\x75\x73\x79\x21\x0D\x0A'):
-                time.sleep(self.delay * (attempt + 1))
-            else:
-                break
-
-        # Check message
-        if (resp[0:2] != HEADER):
-            raise Exception('Wrong header - got {}'.format(hexlify(resp[:2])))
-
-        if (resp[-2:] != FOOTER):
-            raise Exception("Wrong footer - got {}".format(hexlify(resp[-2:])))
-
-        output = resp[2:-2].replace(b'\xFE\xF0', b'\xFE')
-        log.debug('Output: %s', repr(output))
-
-        # EF - result
-        if output[0] == 0xEF:
-            log.debug('Error output: %s', repr(output))
-            # FF - command will be processed, 00 - OK
-            if not output[1] in (0xFF, 0x00):
-                raise Exception(
-                    'Integra reported an error code %X' % output[1]
-                )
-
-        # Function result
-        elif output[0] != command[2]:
-            raise Exception(
-                 "Response to a wrong command - got %s expected %s" % (
-                     output[0], command[2]
-                 )
-             )
-
-        # Calculate response checksum
-        calc_resp_sum = checksum(output[:-2])
-        extr_resp_sum = unpack('>H', output[-2:])[0]
-
-        if extr_resp_sum != calc_resp_sum:
-            raise Exception(
-                "Wrong checksum - got %d expected %d" % (
-                    extr_resp_sum, calc_resp_sum
-                )
-            )
+    def run_command(self, cmd, deadline=None):
+        '''
+        Runs a command given in hex and returns response data. A Deadline
+        limits the time the command may take and allows cancelling it
+        from another thread.
+        '''
+        return self.transport.run_command(cmd, deadline)
 
-        # return only data
-        return output[1:-2]
+    def execute(self, name, *args, deadline=None):
+        '''
+        Runs a command from the registry (see commands.COMMANDS) and
+        returns its decoded response
+        '''
+        command = COMMANDS[name]
+        return command.parse(
+            self.run_command(command.encode(*args), deadline)
+        )
 
     def get_version(self):
         '''
         Returns a dict describing connected Integra
         '''
-        resp = self.run_command('7E')
-        return dict(
-            model='INTEGRA ' + HARDWARE_MODEL.get(resp[0], 'UNKNOWN'),
-            version='{:c}.{:c}{:c} {:c}{:c}{:c}{:c}-{:c}{:c}-{:c}{:c}'.format(
-                *resp[1:12]
-            ),
-            language=LANGUAGES.get(resp[12], 'Other'),
-            settings_stored=(resp[13] == 255)
-        )
+        return self.execute('version')
 
     def get_time(self):
         '''
         Get current Integra time
         '''
-        resp = hexlify(self.run_command('1A'))
-        return datetime(
-            year=int(resp[:4]),
-            month=int(resp[4:6]),
-            day=int(resp[6:8]),
-            hour=int(resp[8:10]),
-            minute=int(resp[10:12]),
-            second=int(resp[12:14])
-        )
+        return self.execute('time')
 
     def get_name(self, kind, number):
         '''
@@ -152,55 +138,221 @@ class Integra(object):
         try:
             name_rec = self._name_cache[(kind, number)]
         except KeyError:
-            resp = self.run_command(b'EE' + hexlify(bytearray([kind, number])))
-            name_rec = parse_name(resp)
+            name_rec = self.execute('name', kind, number)
             name_rec.encoding = self.encoding
             self._name_cache[(kind, number)] = name_rec
 
         return name_rec
 
+    def get_names(self, keys):
+        '''
+        Gets many names at once; each distinct (kind, number) key missing
+        from the cache costs exactly one EE command
+        '''
+        return dict((key, self.get_name(*key)) for key in set(keys))
+
+    def resolve_names(self, events):
+        '''
+        Fetches names needed by events' source and keypad properties in
+        one pass and attaches them to events
+        '''
+        events = list(events)
+        self.get_names(key for evt in events for key in evt.name_keys)
+
+        for evt in events:
+            evt.names = self._name_cache
+
+        return events
+
     def get_event(self, event_id=b'FFFFFF'):
         '''
         Gets an event struct; to get a next event, call
         integra.get_event(last_event.event_index)
         '''
-        current_time = self.get_time()
-        resp = self.run_command(b'8C' + event_id)
-
-        evt = parse_event(resp)
+        current_year = self.clock.current_year
+        evt = self.execute('event', unhexlify(event_id))
         evt.integra = self
-        evt.current_year = current_time.year
+        evt.current_year = current_year
+        evt.names = self._name_cache
+        self.clock.observe(evt)
 
         return evt
 
+    def iter_events(self, start=b'FFFFFF', stop=None, limit=None):
+        '''
+        Walks the event log backwards, starting with the event preceding
+        `start` (newest one by default). Stops before the event with index
+        `stop`, after `limit` events or at the first empty record.
+        '''
+        current_year = self.clock.current_year
+        event_id = start
+        seen = set()
+
+        while limit is None or len(seen) < limit:
+            evt = self.execute('event', unhexlify(event_id))
+            event_id = evt.event_index
+            # the log is a ring buffer - stop when it wraps around
+            if not evt.not_empty or event_id == stop or event_id in seen:
+                break
+
+            seen.add(event_id)
+            evt.integra = self
+            evt.current_year = current_year
+            evt.names = self._name_cache
+            self.clock.observe(evt)
+            yield evt
+
     def get_violated_zones(self):
         '''
         Gets a list of violated zones
         '''
-        resp = self.run_command(b'00')
-        return set_bits_positions(resp, 1)
+        return self.execute('violated_zones')
+
+    def get_bypassed_zones(self):
+        '''
+        Gets a list of bypassed zones
+        '''
+        return self.execute('bypassed_zones')
+
+    def get_zone_temperature(self, zone):
+        '''
+        Gets temperature of a zone in Celsius degrees (None if unknown)
+        '''
+        return self.execute('zone_temperature', zone % 256)
+
+    def get_troubles(self):
+        '''
+        Gets positions of troubles set in troubles part 1
+        '''
+        return self.execute('troubles')
 
     def get_active_outputs(self):
         '''
         Gets a list of numbers of outputs in ON state
         '''
-        resp = self.run_command(b'17')
-        return set_bits_positions(resp, 1)
+        return self.execute('active_outputs')
+
+    def _await_state(self, get_state, expected, timeout, interval):
+        '''
+        Polls state until every index has the expected value or timeout
+        passes; returns a dict: index -> True if confirmed
+        '''
+        deadline = time.monotonic() + timeout
+        while True:
+            state = get_state()
+            outcome = dict(
+                (idx, (idx in state) == value)
+                for idx, value in expected.items()
+            )
+            if all(outcome.values()) or time.monotonic() >= deadline:
+                return outcome
+
+            time.sleep(interval)
+
+    def _control(
+        self,
+        name,
+        indexes,
+        length,
+        get_state,
+        expected,
+        timeout,
+        interval
+    ):
+        self.execute(
+            name,
+            format_user_code(self.user_code),
+            bytes_with_bits_set(indexes, length, 1)
+        )
+        if timeout is None:
+            return None
+
+        return self._await_state(get_state, expected, timeout, interval)
+
+    def arm(self, partitions, mode=0, timeout=2.0, interval=0.1):
+        '''
+        Arms partitions in mode 0-3 and waits up to `timeout` seconds
+        until arming is confirmed; returns a dict:
+        partition -> True if confirmed (None if timeout is None).
+        Arming is confirmed as soon as it starts, so a partition still
+        in its exit delay counts as armed (see
+        get_armed_partitions_suppressed).
+        '''
+        if mode not in (0, 1, 2, 3):
+            raise ValueError('Wrong arming mode {}'.format(mode))
+
+        partitions = set(partitions)
+        return self._control(
+            'arm_mode_{}'.format(mode), partitions, 32,
+            self.get_armed_partitions_suppressed,
+            dict.fromkeys(partitions, True),
+            timeout, interval
+        )
+
+    def disarm(self, partitions, timeout=2.0, interval=0.1):
+        '''
+        Disarms partitions; see arm
+        '''
+        partitions = set(partitions)
+        return self._control(
+            'disarm', partitions, 32,
+            self.get_armed_partitions_suppressed,
+            dict.fromkeys(partitions, False),
+            timeout, interval
+        )
+
+    def outputs_on(self, indexes, timeout=2.0, interval=0.1):
+        '''
+        Switches outputs on and waits until they are reported active;
+        returns a dict: output -> True if confirmed
+        '''
+        indexes = set(indexes)
+        return self._control(
+            'outputs_on', indexes, 128,
+            self.get_active_outputs,
+            dict.fromkeys(indexes, True),
+            timeout, interval
+        )
 
-    def toggle_outputs(self, indexes):
+    def outputs_off(self, indexes, timeout=2.0, interval=0.1):
         '''
-        Toggles outputs with selected indexes;
-        !! Warning !! not tested
+        Switches outputs off; see outputs_on
         '''
-        self.run_command(
-            b'91' +
-            hexlify(format_user_code(self.user_code) +
-            bytes_with_bits_set(indexes, 128, 1))
+        indexes = set(indexes)
+        return self._control(
+            'outputs_off', indexes, 128,
+            self.get_active_outputs,
+            dict.fromkeys(indexes, False),
+            timeout, interval
+        )
+
+    def toggle_outputs(self, indexes, timeout=None, interval=0.1):
+        '''
+        Toggles outputs with selected indexes; given `timeout`, reads
+        outputs first and waits until they are reported toggled, see
+        outputs_on
+        '''
+        indexes = set(indexes)
+        expected = None
+        if timeout is not None:
+            active = self.get_active_outputs()
+            expected = dict((idx, idx not in active) for idx in indexes)
+
+        return self._control(
+            'toggle_outputs', indexes, 128,
+            self.get_active_outputs,
+            expected,
+            timeout, interval
         )
 
     def get_armed_partitions(self):
         '''
         Gets a list of armed partitions
         '''
-        resp = self.run_command(b'0A')
-        return set_bits_positions(resp, 1)
+        return self.execute('armed_partitions')
+
+    def get_armed_partitions_suppressed(self):
+        '''
+        Gets a list of armed partitions, including those in exit delay
+        '''
+        return self.execute('armed_partitions_suppressed')
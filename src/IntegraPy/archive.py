@@ -0,0 +1,243 @@
+# -*- coding: UTF-8 -*-
+'''
+Event log archive -- compact fixed width binary files of panel events
+
+Every record holds the raw 14 byte event as returned by the 8C command,
+preceded by a few decoded key columns (date, minutes, code, partition,
+class) so that the archive can be indexed and queried straight from
+a memory map without decoding every event.
+'''
+import os
+import mmap
+import logging
+from bisect import bisect_left
+from binascii import hexlify
+from struct import Struct
+from concurrent.futures import ThreadPoolExecutor
+
+from .framing import parse_event, date_key
+
+
+MAGIC = b'IPYE'
+VERSION = 1
+
+# magic, version, record size
+FILE_HEADER = Struct('<4sHH')
+# date (YYYYMMDD), minutes, code, partition, class, raw event
+RECORD = Struct('<IHHBB14s')
+
+EXTENSION = '.ipye'
+
+log = logging.getLogger(__name__)
+
+
+class ArchiveWriter(object):
+    '''
+    Appends events to an archive file; use as a context manager
+    '''
+
+    def __init__(self, path, buffering=64 * 1024):
+        self.path = path
+        self._file = open(path, 'ab', buffering)
+
+        if self._file.tell() == 0:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def append(self, evt):
+        self._file.write(RECORD.pack(
+            evt.date_key[0],
+            evt.minutes,
+            evt.code,
+            evt.partition,
+            evt._class,
+            bytes(evt)
+        ))
+
+    def extend(self, events):
+        for evt in events:
+            self.append(evt)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EventArchive(object):
+    '''
+    Memory mapped, read only view of an archive file
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+
+        header = self._file.read(FILE_HEADER.size)
+        magic, version, record_size = FILE_HEADER.unpack(header)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise Exception('Not an event archive: {}'.format(path))
+
+        size = os.fstat(self._file.fileno()).st_size
+        self._count = (size - FILE_HEADER.size) // RECORD.size
+        self._map = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_READ
+        ) if self._count else b''
+
+        self._by_index = None
+        self._by_date = None
+
+    def _offset(self, row):
+        return FILE_HEADER.size + row * RECORD.size
+
+    def _columns(self, row):
+        return RECORD.unpack_from(self._map, self._offset(row))
+
+    def _build_indexes(self):
+        self._by_index = {}
+        self._by_date = []
+
+        for row in range(self._count):
+            date, minutes, _, _, _, raw = self._columns(row)
+            self._by_index[hexlify(raw[8:11]).upper()] = row
+            self._by_date.append((date, minutes, row))
+
+        # batches are appended in chronological order, so this is cheap
+        self._by_date.sort()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self._count
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+
+        columns = self._columns(row)
+        evt = parse_event(columns[5])
+        evt.current_year = columns[0] // 10000
+        return evt
+
+    def __iter__(self):
+        for row in range(self._count):
+            yield self[row]
+
+    @property
+    def last_index(self):
+        '''
+        Index of the newest archived event (None for an empty archive)
+        '''
+        if not self._count:
+            return None
+        return self[-1].event_index
+
+    def find(self, event_index):
+        '''
+        Returns the archived event with given index or None
+        '''
+        if self._by_index is None:
+            self._build_indexes()
+
+        row = self._by_index.get(event_index)
+        return None if row is None else self[row]
+
+    def query(
+        self,
+        since=None,
+        until=None,
+        code=None,
+        partition=None,
+        event_class=None
+    ):
+        '''
+        Yields archived events in chronological order; `since` is
+        inclusive, `until` exclusive, both are dates or datetimes
+        '''
+        if self._by_date is None:
+            self._build_indexes()
+
+        start = 0 if since is None else \
+            bisect_left(self._by_date, date_key(since))
+        end = len(self._by_date) if until is None else \
+            bisect_left(self._by_date, date_key(until))
+
+        for _, _, row in self._by_date[start:end]:
+            _, _, evt_code, evt_partition, evt_class, _ = self._columns(row)
+            if code is not None and evt_code != code:
+                continue
+            if partition is not None and evt_partition != partition:
+                continue
+            if event_class is not None and evt_class != event_class:
+                continue
+            yield self[row]
+
+    def close(self):
+        if self._count:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_events(integra, path, limit=None):
+    '''
+    Appends events newer than the last archived one to an archive file.
+    `limit` caps only the first export, into a new archive; later ones
+    read everything up to the last archived event. Returns the number of
+    exported events.
+    '''
+    stop = None
+    if os.path.exists(path):
+        with EventArchive(path) as archive:
+            stop = archive.last_index
+
+    events = []
+    reached = False
+    for evt in integra.iter_events(limit=limit if stop is None else None):
+        if evt.event_index == stop:
+            reached = True
+            break
+        events.append(evt)
+
+    if stop is not None and not reached:
+        # the panel log wrapped around since the last export
+        log.warning(
+            'Event %s not found in the log of %s:%s, events preceding '
+            '%s were lost', stop.decode(), integra.host, integra.port,
+            events[-1].event_index.decode() if events else 'the oldest one'
+        )
+
+    with ArchiveWriter(path) as writer:
+        # the panel returns the newest events first
+        writer.extend(reversed(events))
+
+    return len(events)
+
+
+def export_fleet(integras, directory, limit=None, max_workers=8):
+    '''
+    Exports event logs of many panels in parallel, one archive file
+    per panel. Returns a dict: (host, port) -> number of exported events.
+    '''
+    def export(integra):
+        path = os.path.join(
+            directory,
+            '{}_{}{}'.format(integra.host, integra.port, EXTENSION)
+        )
+        return export_events(integra, path, limit)
+
+    integras = list(integras)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        counts = executor.map(export, integras)
+        return dict(
+            ((integra.host, integra.port), count)
+            for integra, count in zip(integras, counts)
+        )
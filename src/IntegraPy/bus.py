@@ -0,0 +1,278 @@
+# -*- coding: UTF-8 -*-
+'''
+In-process publish/subscribe of panel events
+
+A single EventFollower reads new events from the event log of a panel
+and publishes them to an EventBus, which fans them out to subscribers:
+queue-like Subscriptions (also usable as iterators and async iterators)
+and callbacks, each called from its own thread. Every subscriber has a
+bounded buffer; when it is full, the oldest or the newest event is
+dropped, or the publisher blocks, depending on the policy. Only BLOCK
+lets a slow subscriber hold back the others.
+'''
+import time
+import asyncio
+import logging
+from collections import deque
+from threading import Condition, Thread
+
+from .exceptions import IntegraError
+from .polling import Poller
+
+log = logging.getLogger(__name__)
+
+DROP_OLDEST = 'drop-oldest'
+DROP_NEWEST = 'drop-newest'
+BLOCK = 'block'
+
+
+class Subscription(object):
+    '''
+    A bounded buffer of events published to the bus
+    '''
+
+    def __init__(self, bus, maxsize=1000, policy=DROP_OLDEST, filter=None):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError('Unknown policy {}'.format(policy))
+
+        self.bus = bus
+        self.maxsize = maxsize
+        self.policy = policy
+        # predicate selecting events, all by default
+        self.filter = filter
+        self.dropped = 0
+        self.closed = False
+
+        self._buffer = deque()
+        self._cond = Condition()
+        self._waiters = []
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def put(self, evt):
+        '''
+        Called by the bus; returns False if the event was dropped
+        '''
+        if self.filter is not None and not self.filter(evt):
+            return True
+
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._buffer) >= self.maxsize:
+                if self.policy == BLOCK:
+                    while len(self._buffer) >= self.maxsize and \
+                            not self.closed:
+                        self._cond.wait()
+                    if self.closed:
+                        return False
+                elif self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                else:
+                    self._buffer.popleft()
+                    self.dropped += 1
+
+            self._buffer.append(evt)
+            self._cond.notify_all()
+            self._wake()
+        return True
+
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def get_batch(self, max_items=100, timeout=None):
+        '''
+        Waits for at least one event; returns up to `max_items` of them,
+        an empty list on timeout or when closed
+        '''
+        with self._cond:
+            if not self._buffer and not self.closed:
+                self._cond.wait_for(
+                    lambda: self._buffer or self.closed, timeout
+                )
+
+            buf = self._buffer
+            batch = [buf.popleft() for n in range(min(max_items, len(buf)))]
+            if batch:
+                # room for blocked publishers
+                self._cond.notify_all()
+            return batch
+
+    def get(self, timeout=None):
+        '''
+        Returns the next event, None on timeout or when closed
+        '''
+        batch = self.get_batch(1, timeout)
+        return batch[0] if batch else None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            self._wake()
+
+    def __iter__(self):
+        while True:
+            evt = self.get()
+            if evt is None:
+                return
+            yield evt
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            batch = self.get_batch(1, 0)
+            if batch:
+                return batch[0]
+            if self.closed:
+                raise StopAsyncIteration
+
+            loop = asyncio.get_event_loop()
+            future = loop.create_future()
+            with self._cond:
+                if self._buffer or self.closed:
+                    continue
+                self._waiters.append((loop, future))
+            await future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class EventBus(object):
+    '''
+    Fans out published events to subscribers
+    '''
+
+    def __init__(self):
+        self._subscriptions = []
+
+    @property
+    def subscriptions(self):
+        return list(self._subscriptions)
+
+    def subscribe(self, maxsize=1000, policy=DROP_OLDEST, filter=None):
+        '''
+        Returns a new Subscription
+        '''
+        subscription = Subscription(self, maxsize, policy, filter)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def subscribe_callback(
+        self,
+        callback,
+        batch=1,
+        maxsize=1000,
+        policy=DROP_OLDEST,
+        filter=None
+    ):
+        '''
+        Calls callback(event) - or callback(list of events) if `batch` is
+        above 1 - from a dedicated thread. Returns the Subscription;
+        closing it stops the thread.
+        '''
+        subscription = self.subscribe(maxsize, policy, filter)
+
+        def deliver():
+            while True:
+                events = subscription.get_batch(batch)
+                if not events:
+                    return
+                try:
+                    callback(events if batch > 1 else events[0])
+                except Exception:
+                    log.exception('Event subscriber failed')
+
+        thread = Thread(target=deliver)
+        thread.daemon = True
+        thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        try:
+            self._subscriptions.remove(subscription)
+        except ValueError:
+            pass
+
+    def publish(self, evt):
+        for subscription in self.subscriptions:
+            subscription.put(evt)
+
+    def close(self):
+        for subscription in self.subscriptions:
+            subscription.close()
+
+
+class EventFollower(Poller):
+    '''
+    Reads events appended to the event log of a panel since the last
+    poll and publishes them to the bus, oldest first. On the first poll
+    it only remembers the newest event, or publishes `backlog` last ones.
+    '''
+
+    def __init__(
+        self,
+        integra,
+        bus=None,
+        interval=1.0,
+        backlog=0,
+        resolve_names=True
+    ):
+        super(EventFollower, self).__init__()
+        self.integra = integra
+        self.bus = bus or EventBus()
+        self.interval = interval
+        self.backlog = backlog
+        self.resolve_names = resolve_names
+        # index of the newest event published
+        self.cursor = None
+
+    def poll(self):
+        '''
+        Publishes new events; returns their number
+        '''
+        if self.cursor is None:
+            evt = self.integra.get_event()
+            if not evt.not_empty:
+                return 0
+            # the newest event was just read, the backlog continues from it
+            events = [evt] + list(self.integra.iter_events(
+                start=evt.event_index, limit=self.backlog - 1
+            )) if self.backlog else []
+            self.cursor = evt.event_index
+        else:
+            events = list(self.integra.iter_events(stop=self.cursor))
+            if events:
+                self.cursor = events[0].event_index
+
+        events.reverse()
+        if events and self.resolve_names:
+            self.integra.resolve_names(events)
+        for evt in events:
+            self.bus.publish(evt)
+        return len(events)
+
+    def _step(self):
+        started = time.monotonic()
+        try:
+            self.poll()
+        except IntegraError as exc:
+            log.warning('Following events of %s:%s failed: %s',
+                        self.integra.host, self.integra.port, exc)
+        return self.interval - (time.monotonic() - started)
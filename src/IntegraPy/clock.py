@@ -0,0 +1,111 @@
+# -*- coding: UTF-8 -*-
+'''
+Panel clock tracking -- answers panel time locally from the host's
+monotonic clock, reading it from the panel (1A) only now and then
+'''
+from datetime import timedelta
+from threading import Lock
+from time import monotonic
+
+
+class PanelClock(object):
+    '''
+    Tracks the offset between the panel clock and the host monotonic
+    clock. The panel is asked again after `refresh_interval` seconds;
+    the interval is shortened while measured drift exceeds `max_drift`.
+    '''
+
+    def __init__(
+        self,
+        integra,
+        refresh_interval=3600.0,
+        min_interval=60.0,
+        max_drift=2.0
+    ):
+        self.integra = integra
+        self.refresh_interval = refresh_interval
+        self.min_interval = min_interval
+        self.max_drift = max_drift
+
+        self._lock = Lock()
+        self._interval = refresh_interval
+        # monotonic time and panel time of the last reading
+        self._mono_ref = None
+        self._panel_ref = None
+        self._next_sync = 0
+
+        # round trip time and drift measured on the last reading
+        self.rtt = None
+        self.drift = None
+
+    def _predict(self, mono):
+        return self._panel_ref + timedelta(seconds=mono - self._mono_ref)
+
+    def sync(self):
+        '''
+        Reads panel time, compensating for the round trip
+        '''
+        with self._lock:
+            sent = monotonic()
+            panel_time = self.integra.get_time()
+            received = monotonic()
+
+            # panel time has 1 s resolution - assume the middle of the second
+            # and that it was read in the middle of the round trip
+            mono = (sent + received) / 2
+            panel_time += timedelta(seconds=0.5)
+
+            if self._panel_ref is not None:
+                self.drift = (
+                    panel_time - self._predict(mono)
+                ).total_seconds()
+                if abs(self.drift) > self.max_drift:
+                    self._interval = max(self.min_interval, self._interval / 2)
+                else:
+                    self._interval = min(
+                        self.refresh_interval, self._interval * 2
+                    )
+
+            self.rtt = received - sent
+            self._mono_ref = mono
+            self._panel_ref = panel_time
+            self._next_sync = received + self._interval
+
+    def invalidate(self):
+        '''
+        Forces a reading on the next query, e.g. after the panel clock
+        has been set
+        '''
+        self._next_sync = 0
+
+    def get_time(self):
+        '''
+        Current panel time
+        '''
+        now = monotonic()
+        if now >= self._next_sync:
+            self.sync()
+            now = monotonic()
+
+        return self._predict(now).replace(microsecond=0)
+
+    @property
+    def current_year(self):
+        return self.get_time().year
+
+    def observe(self, evt):
+        '''
+        Checks an event timestamp against tracked time; an event from the
+        future means the panel clock was changed, so it is read again
+        '''
+        if self._panel_ref is None:
+            return
+
+        try:
+            timestamp = evt.timestamp
+        except ValueError:
+            return
+
+        # events have 1 minute resolution
+        if timestamp - self._predict(monotonic()) > timedelta(minutes=1):
+            self.invalidate()
@@ -0,0 +1,123 @@
+# -*- coding: UTF-8 -*-
+'''
+Declarative registry of integration protocol commands
+
+Each command is described once - its code, request payload layout and
+response layout - and compiled into struct.Struct objects when
+registered, so encoding and decoding cost no per-call format parsing.
+'''
+from binascii import hexlify
+from datetime import datetime
+from struct import Struct
+
+from .constants import HARDWARE_MODEL, LANGUAGES
+from .framing import parse_event, parse_name, set_bits_positions
+
+
+# packed BCD byte -> value
+BCD = [(byte >> 4) * 10 + (byte & 0x0F) for byte in range(256)]
+
+COMMANDS = {}
+
+
+class Command(object):
+    '''
+    An integration protocol command. `request` and `response` are
+    struct format strings (big endian); `decode` is called with unpacked
+    response values, or with raw response data if `response` is None.
+    '''
+
+    def __init__(self, name, code, request='', response=None, decode=None):
+        self.name = name
+        self.code = code
+        self.request = Struct('>' + request)
+        self.response = None if response is None else Struct('>' + response)
+        self.decode = decode
+        self._prefix = bytearray([code])
+
+    def encode(self, *args):
+        '''
+        Returns the command in the form accepted by Integra.run_command
+        '''
+        return hexlify(self._prefix + self.request.pack(*args)).upper()
+
+    def parse(self, data):
+        if self.response is None:
+            return self.decode(data) if self.decode else data
+
+        values = self.response.unpack_from(bytes(data))
+        return self.decode(*values) if self.decode else values
+
+    def __repr__(self):
+        return 'Command {0.name} ({0.code:02X})'.format(self)
+
+
+def register(name, code, request='', response=None, decode=None):
+    COMMANDS[name] = Command(name, code, request, response, decode)
+    return COMMANDS[name]
+
+
+def bitmap(data):
+    return set_bits_positions(data, 1)
+
+
+def decode_version(model, version, language, settings_stored):
+    version = bytearray(version)
+    return dict(
+        model='INTEGRA ' + HARDWARE_MODEL.get(model, 'UNKNOWN'),
+        version='{:c}.{:c}{:c} {:c}{:c}{:c}{:c}-{:c}{:c}-{:c}{:c}'.format(
+            *version
+        ),
+        language=LANGUAGES.get(language, 'Other'),
+        settings_stored=(settings_stored == 255)
+    )
+
+
+def decode_time(year_high, year_low, month, day, hour, minute, second):
+    return datetime(
+        year=BCD[year_high] * 100 + BCD[year_low],
+        month=BCD[month],
+        day=BCD[day],
+        hour=BCD[hour],
+        minute=BCD[minute],
+        second=BCD[second]
+    )
+
+
+def decode_temperature(zone, value):
+    # 0xFFFF - temperature undetermined
+    if value == 0xFFFF:
+        return None
+    return (value - 110) / 2.0
+
+
+# zone state bitmaps
+register('violated_zones', 0x00, decode=bitmap)
+register('tampered_zones', 0x01, decode=bitmap)
+register('alarm_zones', 0x02, decode=bitmap)
+register('alarm_memory_zones', 0x04, decode=bitmap)
+register('bypassed_zones', 0x06, decode=bitmap)
+
+# partition state bitmaps; 09 reports partitions as soon as arming
+# starts, 0A only after the exit delay
+register('armed_partitions_suppressed', 0x09, decode=bitmap)
+register('armed_partitions', 0x0A, decode=bitmap)
+register('alarm_partitions', 0x13, decode=bitmap)
+
+# output state bitmap
+register('active_outputs', 0x17, decode=bitmap)
+
+register('time', 0x1A, response='7B', decode=decode_time)
+register('troubles', 0x1B, decode=bitmap)
+register('zone_temperature', 0x7D, 'B', 'BH', decode_temperature)
+register('version', 0x7E, response='B11sBB', decode=decode_version)
+register('event', 0x8C, '3s', decode=parse_event)
+register('name', 0xEE, 'BB', decode=parse_name)
+
+# control commands: user code, partitions or outputs bitmap
+for mode in range(4):
+    register('arm_mode_{}'.format(mode), 0x80 + mode, '8s4s')
+register('disarm', 0x84, '8s4s')
+register('outputs_on', 0x88, '8s16s')
+register('outputs_off', 0x89, '8s16s')
+register('toggle_outputs', 0x91, '8s16s')
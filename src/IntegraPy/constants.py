@@ -11,6 +11,8 @@ OUTPUT = 4
 
 HEADER = b'\xFE\xFE'
 FOOTER = b'\xFE\x0D'
+# integra responds with this instead of a frame when commands come too fast
+BUSY = b'\x10\x42\x75\x73\x79\x21\x0D\x0A'
 HARDWARE_MODEL = {
     0: "24",
     1: "32",
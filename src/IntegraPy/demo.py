@@ -1,8 +1,22 @@
 # -*- coding: utf-8 -*-
+'''
+demo -- shows state and last events of a panel
+
+With --watch keeps one connection open and refreshes the state every
+--interval seconds, reading only events added since the last refresh
+and redrawing only the lines that changed. A failed refresh is shown
+on a status line below the last screen and retried at the next one.
+'''
 from __future__ import unicode_literals, print_function
 import sys
+import time
+import argparse
+from collections import deque
 
 from .constants import PARTITION, ZONE, OUTPUT
+from .exceptions import IntegraError
+from .bus import EventFollower
+from .transport import BlockingTransport
 from . import Integra
 
 template = '''\
@@ -13,46 +27,159 @@ Armed partitions: {2}
 Violated zones:   {3}
 Active outputs:   {4}
 -------------------------------------------------------------------------------
-10 last events:
-{5}
-'''
+{5} last events:
+Date & time      | Code | Source
+{6}'''
 
-if len(sys.argv) < 2:
-    print("demo <IP_ADDRESS_OF_THE_ETHM1_MODULE>", file=sys.stderr)
-    sys.exit(1)
-
-integra = Integra(user_code=1234, host=sys.argv[1])
-armed_partitions = ', '.join(
-    integra.get_name(PARTITION, part).name
-    for part in integra.get_armed_partitions()
-)
-violated_zones = ', '.join(
-    integra.get_name(ZONE, zone).name
-    for zone in integra.get_violated_zones()
-)
-active_outputs = ', '.join(
-    integra.get_name(OUTPUT, out).name
-    for out in integra.get_active_outputs()
-)
-
-last_events = 'Date & time      | Code | Source\n'
-event_idx = b'FFFFFF'
-for idx in range(10):
-    res = integra.get_event(event_idx)
-    last_events += (
-        '{0.year:02d}-{0.month:02d}-{0.day:02d} '
-        '{0.time} |  {0.code} | {0.source_number}\n'
-    ).format(res)
-    event_idx = res.event_index
-
-
-print(
-    template.format(
-        integra.get_version(),
-        integra.get_time(),
-        armed_partitions,
-        violated_zones,
-        active_outputs,
-        last_events
+event_template = '{0.year:02d}-{0.month:02d}-{0.day:02d} ' \
+    '{0.time} |  {0.code} | {0.source_number}'
+
+
+def names(integra, kind, numbers):
+    # names are cached by Integra, read once per object
+    return ', '.join(
+        integra.get_name(kind, number).name for number in sorted(numbers)
     )
-)
+
+
+class Screen(object):
+    '''
+    Redraws only changed lines of a terminal, using ANSI escape codes
+    '''
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.lines = None
+
+    def draw(self, lines):
+        out = self.out
+        previous = self.lines
+        if previous is None:
+            # clear the screen on the first draw
+            out.write('\x1b[2J')
+            previous = []
+
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                out.write('\x1b[{};1H{}\x1b[K'.format(row + 1, line))
+        for row in range(len(lines), len(previous)):
+            out.write('\x1b[{};1H\x1b[K'.format(row + 1))
+
+        out.write('\x1b[{};1H'.format(len(lines) + 1))
+        out.flush()
+        self.lines = list(lines)
+
+
+class Demo(object):
+    '''
+    Reads everything shown; the version once, events through
+    an EventFollower
+    '''
+
+    def __init__(self, integra, events=10):
+        self.integra = integra
+        # read on the first refresh
+        self.version = None
+        # only source numbers are shown, names of sources are not needed
+        self.follower = EventFollower(
+            integra, backlog=events, resolve_names=False
+        )
+        self.subscription = self.follower.bus.subscribe()
+        # newest first
+        self.events = deque(maxlen=events)
+        # the last screen refreshed successfully
+        self.lines = []
+
+    def refresh(self):
+        integra = self.integra
+        if self.version is None:
+            self.version = integra.get_version()
+        self.follower.poll()
+        for evt in self.subscription.get_batch(timeout=0):
+            self.events.appendleft(evt)
+
+        return template.format(
+            self.version,
+            integra.clock.get_time(),
+            names(integra, PARTITION, integra.get_armed_partitions()),
+            names(integra, ZONE, integra.get_violated_zones()),
+            names(integra, OUTPUT, integra.get_active_outputs()),
+            self.events.maxlen,
+            '\n'.join(event_template.format(evt) for evt in self.events)
+        ).splitlines()
+
+    def watch(self, screen, interval=2.0, iterations=None):
+        '''
+        Refreshes until interrupted or after `iterations`; errors are
+        shown below the last screen and the refresh is retried
+        '''
+        count = 0
+        while iterations is None or count < iterations:
+            started = time.monotonic()
+            try:
+                self.lines = self.refresh()
+                screen.draw(self.lines)
+            except IntegraError as exc:
+                screen.draw(self.lines + ['Refresh failed: {}'.format(exc)])
+            count += 1
+            if iterations is None or count < iterations:
+                time.sleep(max(interval - (time.monotonic() - started), 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m IntegraPy.demo',
+        description='Show state and last events of an Integra panel'
+    )
+    parser.add_argument('host', help='IP of the ETHM-1 module')
+    parser.add_argument('--port', type=int, default=7094)
+    parser.add_argument('--user-code', type=int, default=1234)
+    parser.add_argument(
+        '--integration-key', help='use encrypted integration (ETHM-1 Plus)'
+    )
+    parser.add_argument('--events', type=int, default=10)
+    parser.add_argument(
+        '--watch', action='store_true', help='refresh until interrupted'
+    )
+    parser.add_argument('--interval', type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    transport = None
+    if args.watch:
+        # one connection for the whole session
+        if args.integration_key is None:
+            transport = BlockingTransport(
+                args.host, args.port, persistent=True
+            )
+        else:
+            from .encryption import EncryptedTransport
+
+            transport = EncryptedTransport(
+                args.host, args.port, persistent=True,
+                integration_key=args.integration_key
+            )
+
+    integra = Integra(
+        user_code=args.user_code,
+        host=args.host,
+        port=args.port,
+        transport=transport,
+        integration_key=args.integration_key
+    )
+    try:
+        demo = Demo(integra, args.events)
+        if args.watch:
+            demo.watch(Screen(), args.interval)
+        else:
+            print('\n'.join(demo.refresh()))
+    except KeyboardInterrupt:
+        pass
+    except IntegraError as exc:
+        print('Reading {} failed: {}'.format(args.host, exc), file=sys.stderr)
+        return 1
+    finally:
+        integra.transport.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
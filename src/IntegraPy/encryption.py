@@ -0,0 +1,225 @@
+# -*- coding: UTF-8 -*-
+'''
+Encrypted integration of ETHM-1 Plus modules
+
+Every frame is wrapped in a PDU: 2 random bytes, a 2 byte rolling
+counter, id_s (a random byte identifying the message) and id_r (id_s of
+the last message received from the other side). The PDU is encrypted
+with AES-192 keyed by the integration key and sent prefixed with its
+length. A response is accepted only if its id_r matches our id_s.
+
+Blocks are chained like in CBC with E(0) as the initialization vector;
+a partial last block is XORed with E(previous block) instead. PDUs
+shorter than a block are padded with zeros.
+
+Needs the cryptography package: pip install IntegraPy[encryption]
+'''
+import os
+import argparse
+from struct import Struct
+from threading import Lock
+from timeit import default_timer
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import (
+        Cipher, algorithms, modes
+    )
+except ImportError:
+    Cipher = None
+
+from .constants import BUSY, FOOTER
+from .exceptions import ProtocolError
+from .framing import prepare_frame
+from .protocol import IntegraProtocol
+from .transport import BlockingTransport
+
+BLOCK = 16
+# random bytes, rolling counter, id_s, id_r
+HEADER = Struct('>2sHBB')
+
+
+def encryption_key(integration_key):
+    '''
+    24 byte AES key: the integration key padded with spaces to 12
+    characters, twice
+    '''
+    if not isinstance(integration_key, bytes):
+        integration_key = integration_key.encode('ascii')
+    key = integration_key[:12].ljust(12, b' ')
+    return key + key
+
+
+class SatelCipher(object):
+    '''
+    Encrypts and decrypts PDUs; the AES contexts are created once and
+    shared by all connections using the same key
+    '''
+
+    def __init__(self, integration_key):
+        if Cipher is None:
+            raise ImportError(
+                'Encrypted integration needs the cryptography package'
+            )
+
+        cipher = Cipher(
+            algorithms.AES(encryption_key(integration_key)),
+            modes.ECB(),
+            backend=default_backend()
+        )
+        # ECB contexts are never finalized, update works block by block
+        self._encrypt = cipher.encryptor().update
+        self._decrypt = cipher.decryptor().update
+        self._lock = Lock()
+        self._iv = self._encrypt(bytes(BLOCK))
+
+    @staticmethod
+    def _xor(data, start, cv, length=BLOCK):
+        for i in range(length):
+            data[start + i] ^= cv[i]
+
+    def encrypt(self, pdu):
+        data = bytearray(pdu)
+        if len(data) < BLOCK:
+            data.extend(bytes(BLOCK - len(data)))
+
+        with self._lock:
+            cv = self._iv
+            full = len(data) - len(data) % BLOCK
+            for start in range(0, full, BLOCK):
+                self._xor(data, start, cv)
+                cv = self._encrypt(bytes(data[start:start + BLOCK]))
+                data[start:start + BLOCK] = cv
+            if full < len(data):
+                cv = self._encrypt(cv)
+                self._xor(data, full, cv, len(data) - full)
+
+        return bytes(data)
+
+    def decrypt(self, message):
+        data = bytearray(message)
+
+        with self._lock:
+            cv = self._iv
+            full = len(data) - len(data) % BLOCK
+            for start in range(0, full, BLOCK):
+                block = bytes(data[start:start + BLOCK])
+                data[start:start + BLOCK] = self._decrypt(block)
+                self._xor(data, start, cv)
+                cv = block
+            if full < len(data):
+                cv = self._encrypt(cv)
+                self._xor(data, full, cv, len(data) - full)
+
+        return bytes(data)
+
+    def seal(self, counter, id_s, id_r, data):
+        '''
+        Returns an encrypted, length prefixed message
+        '''
+        message = self.encrypt(
+            HEADER.pack(os.urandom(2), counter, id_s, id_r) + data
+        )
+        return bytes(bytearray([len(message)])) + message
+
+    def open(self, message):
+        '''
+        Decrypts a message without its length byte; returns
+        (counter, id_s, id_r, data) with padding removed from data
+        '''
+        pdu = self.decrypt(message)
+        if len(pdu) < HEADER.size:
+            raise ProtocolError('Encrypted message too short')
+
+        _, counter, id_s, id_r = HEADER.unpack_from(pdu)
+        return counter, id_s, id_r, strip_padding(pdu[HEADER.size:])
+
+
+def strip_padding(data):
+    '''
+    Cuts zeros padding a short PDU; FE 0D ends a frame as FE is stuffed
+    everywhere else
+    '''
+    end = data.rfind(FOOTER)
+    if end >= 0:
+        return data[:end + len(FOOTER)]
+    if data.startswith(BUSY):
+        return data[:len(BUSY)]
+    return data
+
+
+class EncryptedProtocol(IntegraProtocol):
+    '''
+    IntegraProtocol exchanging encrypted messages; state of a single
+    connection
+    '''
+
+    def __init__(self, cipher):
+        super(EncryptedProtocol, self).__init__()
+        self.cipher = cipher
+        self.counter = 0
+        self.id_s = None
+        self.id_r = 0
+        self._received = bytearray()
+
+    def send_frame(self, frame):
+        frame = super(EncryptedProtocol, self).send_frame(frame)
+        self.id_s = bytearray(os.urandom(1))[0]
+        message = self.cipher.seal(self.counter, self.id_s, self.id_r, frame)
+        self.counter = (self.counter + 1) & 0xFFFF
+        return message
+
+    def receive_data(self, data):
+        buf = self._received
+        buf += data
+        while buf and len(buf) > buf[0]:
+            end = buf[0] + 1
+            message = bytes(buf[1:end])
+            del buf[:end]
+
+            counter, id_s, id_r, plain = self.cipher.open(message)
+            if id_r != self.id_s:
+                raise ProtocolError('Response to another message')
+            self.id_r = id_s
+            super(EncryptedProtocol, self).receive_data(plain)
+
+
+class EncryptedTransport(BlockingTransport):
+    '''
+    BlockingTransport speaking the encrypted integration protocol
+    '''
+
+    def __init__(self, host, port=7094, integration_key='', **kwargs):
+        super(EncryptedTransport, self).__init__(host, port, **kwargs)
+        self.cipher = SatelCipher(integration_key)
+
+    def _new_protocol(self):
+        return EncryptedProtocol(self.cipher)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m IntegraPy.encryption',
+        description='Measure encryption cost per command'
+    )
+    parser.add_argument('--count', type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    cipher = SatelCipher('benchmark')
+    # 00 - a short request and a 16 byte state response
+    request = prepare_frame('00')
+    response = prepare_frame('00' + '00' * 16)
+
+    start = default_timer()
+    for n in range(args.count):
+        cipher.decrypt(cipher.encrypt(HEADER.pack(b'ab', n, 1, 2) + request))
+        cipher.decrypt(cipher.encrypt(HEADER.pack(b'ab', n, 2, 1) + response))
+    elapsed = default_timer() - start
+
+    print('{:.1f} us per command (request and response, both ways)'.format(
+        elapsed / args.count * 1e6
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: UTF-8 -*-
+'''
+Exceptions raised when talking to Integra
+'''
+
+
+class IntegraError(Exception):
+    '''
+    Base of all errors raised by the library
+    '''
+
+
+class IntegraConnectionError(IntegraError):
+    '''
+    Connection could not be opened or was closed by the module
+    '''
+
+
+class IntegraTimeout(IntegraError):
+    '''
+    Connect or read timeout, or the command deadline passed
+    '''
+
+
+class IntegraCancelled(IntegraError):
+    '''
+    The command was cancelled
+    '''
+
+
+class IntegraBusy(IntegraError):
+    '''
+    Integra answered "Busy!" to all attempts
+    '''
+
+
+class ProtocolError(IntegraError):
+    '''
+    Malformed response - wrong header, footer or command echo
+    '''
+
+
+class ChecksumError(ProtocolError):
+    '''
+    Response checksum does not match
+    '''
+
+
+class ResultError(IntegraError):
+    '''
+    Integra reported an error code in an EF response
+    '''
+
+    def __init__(self, code):
+        super(ResultError, self).__init__(
+            'Integra reported an error code %X' % code
+        )
+        self.code = code
+
+
+class CircuitOpen(IntegraError):
+    '''
+    The panel is known to be unreachable; the command was not sent
+    '''
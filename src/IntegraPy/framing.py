@@ -2,6 +2,9 @@
 '''
 Protocol framing
 '''
+import logging
+from struct import unpack
+
 try:
     from itertools import zip_longest
 except ImportError:
@@ -17,8 +20,10 @@ from ctypes import (
     addressof
 )
 from binascii import hexlify, unhexlify
+from datetime import datetime
 
 
+from .exceptions import ProtocolError, ChecksumError, ResultError
 from .constants import (
     HEADER, FOOTER, EVENT_MONITORING, EVENT_CLASSES, EVENT_DESCRIPTIONS,
     OBJECT_KINDS
@@ -26,6 +31,8 @@ from .constants import (
 
 from bitarray import bitarray
 
+log = logging.getLogger(__name__)
+
 
 def set_bits_positions(data, offset=1):
     '''
@@ -102,6 +109,65 @@ def prepare_frame(command):
     return HEADER + data + FOOTER
 
 
+def date_key(value):
+    '''
+    Converts a date or datetime to a (YYYYMMDD, minutes) tuple, the form
+    events are indexed by
+    '''
+    return (
+        value.year * 10000 + value.month * 100 + value.day,
+        getattr(value, 'hour', 0) * 60 + getattr(value, 'minute', 0)
+    )
+
+
+def check_response(command, resp):
+    '''
+    Validates a response frame to a prepared command frame and returns
+    the response data
+    '''
+    if (resp[0:2] != HEADER):
+        raise ProtocolError(
+            'Wrong header - got {}'.format(hexlify(resp[:2]))
+        )
+
+    if (resp[-2:] != FOOTER):
+        raise ProtocolError(
+            "Wrong footer - got {}".format(hexlify(resp[-2:]))
+        )
+
+    output = bytearray(resp[2:-2]).replace(b'\xFE\xF0', b'\xFE')
+    log.debug('Output: %s', repr(output))
+
+    # EF - result
+    if output[0] == 0xEF:
+        log.debug('Error output: %s', repr(output))
+        # FF - command will be processed, 00 - OK
+        if not output[1] in (0xFF, 0x00):
+            raise ResultError(output[1])
+
+    # Function result
+    elif output[0] != command[2]:
+        raise ProtocolError(
+             "Response to a wrong command - got %s expected %s" % (
+                 output[0], command[2]
+             )
+         )
+
+    # Calculate response checksum
+    calc_resp_sum = checksum(output[:-2])
+    extr_resp_sum = unpack('>H', output[-2:])[0]
+
+    if extr_resp_sum != calc_resp_sum:
+        raise ChecksumError(
+            "Wrong checksum - got %d expected %d" % (
+                extr_resp_sum, calc_resp_sum
+            )
+        )
+
+    # return only data
+    return output[1:-2]
+
+
 class EventRecord(LittleEndianStructure):
     _fields_ = [
         ('_monitoring_s1', c_uint8, 2),
@@ -127,6 +193,8 @@ class EventRecord(LittleEndianStructure):
 
     integra = None
     current_year = 0
+    # resolved names, keys: (kind, number)
+    names = None
 
     @property
     def monitoring_s1(self):
@@ -140,17 +208,39 @@ class EventRecord(LittleEndianStructure):
     def event_class(self):
         return EVENT_CLASSES[self._class]
 
+    @property
+    def minutes(self):
+        return self.minutes_high * 0x100 + self.minutes_low
+
     @property
     def time(self):
-        minutes = self.minutes_high * 0x100 + self.minutes_low
         return '{:02d}:{:02d}'.format(
-            minutes // 60,
-            minutes % 60
+            self.minutes // 60,
+            self.minutes % 60
         )
 
     @property
     def year(self):
-        return self.current_year // 4 * 4 + self._year
+        year = self.current_year // 4 * 4 + self._year
+        # only 2 lowest bits of the year are stored - an event can not
+        # be newer than the current year
+        if self.current_year and year > self.current_year:
+            year -= 4
+        return year
+
+    @property
+    def date_key(self):
+        return (
+            self.year * 10000 + self.month * 100 + self.day,
+            self.minutes
+        )
+
+    @property
+    def timestamp(self):
+        return datetime(
+            self.year, self.month, self.day,
+            self.minutes // 60, self.minutes % 60
+        )
 
     @property
     def code(self):
@@ -179,28 +269,43 @@ class EventRecord(LittleEndianStructure):
         )[1]
 
     @property
-    def source(self):
-        source_kind = EVENT_DESCRIPTIONS.get(
+    def source_kind(self):
+        return EVENT_DESCRIPTIONS.get(
             (self.code, self.restore), (0, 'UNKNOWN')
         )[0]
 
-        if source_kind == 3:
-            return self.integra.get_name(2, self.source_number).name
-        else:
+    @property
+    def name_keys(self):
+        '''
+        (kind, number) keys of names needed by source and keypad
+        '''
+        if self.source_kind == 3:
+            return [
+                (2, self.source_number),
+                (3, 129 + self.restore * 32 + self.partition)
+            ]
+        return []
+
+    def _name(self, idx):
+        if self.source_kind != 3:
             return 'Not implemented'
 
+        name_rec = (self.names or {}).get(self.name_keys[idx])
+        return name_rec.name if name_rec else None
+
     @property
-    def keypad(self):
-        source_kind = EVENT_DESCRIPTIONS.get(
-            (self.code, self.restore), (0, 'UNKNOWN')
-        )[0]
+    def source(self):
+        '''
+        Source name; None until resolved with Integra.resolve_names
+        '''
+        return self._name(0)
 
-        if source_kind == 3:
-            return self.integra.get_name(
-                3, 129 + self.restore * 32 + self.partition
-            ).name
-        else:
-            return 'Not implemented'
+    @property
+    def keypad(self):
+        '''
+        Keypad name; None until resolved with Integra.resolve_names
+        '''
+        return self._name(1)
 
     def __repr__(self):
         return (
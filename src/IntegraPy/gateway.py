@@ -0,0 +1,220 @@
+# -*- coding: UTF-8 -*-
+'''
+gateway -- a local daemon fronting a single panel for many clients
+
+Clients speak the regular integration protocol to the gateway (an
+Integra instance pointed at the gateway's address works unchanged).
+The gateway serializes commands to the panel, answers read-only
+queries from a TTL cache and coalesces identical in-flight ones. Any
+other command is forwarded on its own and drops the cached state.
+
+    python -m IntegraPy.gateway <IP_ADDRESS_OF_THE_ETHM1_MODULE>
+'''
+import time
+import logging
+import argparse
+from threading import Lock, Event
+
+try:
+    from socketserver import ThreadingTCPServer, BaseRequestHandler
+except ImportError:
+    from SocketServer import ThreadingTCPServer, BaseRequestHandler
+
+from .constants import FOOTER
+from .framing import check_response
+from .transport import BlockingTransport
+
+
+log = logging.getLogger(__name__)
+
+# read-only commands and seconds their responses stay cached
+CACHE_TTL = {
+    0x7E: 300.0,  # version
+    0xEE: 300.0,  # names
+    0x00: 1.0,  # violated zones
+    0x0A: 1.0,  # armed partitions
+    0x17: 1.0,  # active outputs
+}
+
+# read-only commands never cached: their answers change every time
+# (time, event log) or they are rarely sent; they leave the cache alone,
+# every other command may change panel state and clears it
+UNCACHED_READS = frozenset([
+    0x09,  # armed partitions, including exit delay
+    0x1A,  # time
+    0x1B, 0x1C, 0x1D, 0x1E, 0x1F, 0x20, 0x21,  # troubles
+    0x7D,  # zone temperature
+    0x7F,  # new data flags
+    0x8C,  # event
+])
+
+class _Pending(object):
+    def __init__(self):
+        self.done = Event()
+        self.response = None
+        self.error = None
+
+
+class Gateway(object):
+    '''
+    Forwards frames to an Integra client, caching and coalescing them
+    '''
+
+    def __init__(self, integra, cache_ttl=None):
+        self.integra = integra
+        self.cache_ttl = CACHE_TTL if cache_ttl is None else cache_ttl
+        self.reads = frozenset(CACHE_TTL) | frozenset(self.cache_ttl) | \
+            UNCACHED_READS
+
+        # only one command at a time reaches the panel
+        self._upstream_lock = Lock()
+        self._lock = Lock()
+        # command frame -> (expiry time, response frame)
+        self._cache = {}
+        # command frame -> _Pending
+        self._in_flight = {}
+        # bumped when the cache is cleared; responses read before that
+        # are not stored
+        self._generation = 0
+
+        self.stats = dict(requests=0, cached=0, coalesced=0, upstream=0)
+
+    def _forward(self, command):
+        with self._upstream_lock:
+            self.stats['upstream'] += 1
+            return self.integra.transport.exchange(command).frame
+
+    def handle_frame(self, command):
+        '''
+        Returns the response frame to a command frame
+        '''
+        command = bytes(command)
+        code = bytearray(command)[2]
+        ttl = self.cache_ttl.get(code)
+        if ttl is None:
+            # never merged: two identical switch commands toggle twice
+            return self._send(command, code)
+
+        with self._lock:
+            self.stats['requests'] += 1
+
+            cached = self._cache.get(command)
+            if cached and cached[0] > time.monotonic():
+                self.stats['cached'] += 1
+                return cached[1]
+
+            pending = self._in_flight.get(command)
+            if pending:
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                pending = self._in_flight[command] = _Pending()
+                leader = True
+            generation = self._generation
+
+        if not leader:
+            pending.done.wait()
+            if pending.error:
+                raise pending.error
+            return pending.response
+
+        try:
+            pending.response = self._forward(command)
+        except Exception as exc:
+            pending.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[command]
+                if generation == self._generation:
+                    self._store(command, ttl, pending.response)
+            pending.done.set()
+
+        return pending.response
+
+    def _send(self, command, code):
+        with self._lock:
+            self.stats['requests'] += 1
+        try:
+            return self._forward(command)
+        finally:
+            if code not in self.reads:
+                with self._lock:
+                    self._cache.clear()
+                    self._generation += 1
+
+    def _store(self, command, ttl, response):
+        try:
+            check_response(command, response)
+        except Exception:
+            # never cache "Busy!" or broken responses
+            return
+
+        self._cache[command] = (time.monotonic() + ttl, response)
+
+
+class _Handler(BaseRequestHandler):
+
+    def handle(self):
+        gateway = self.server.gateway
+        buf = b''
+
+        while True:
+            data = self.request.recv(1024)
+            if not data:
+                break
+
+            buf += data
+            while FOOTER in buf:
+                end = buf.index(FOOTER) + len(FOOTER)
+                command, buf = buf[:end], buf[end:]
+                try:
+                    self.request.sendall(gateway.handle_frame(command))
+                except Exception:
+                    log.exception('Command failed')
+                    return
+
+
+class GatewayServer(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, gateway, address=('127.0.0.1', 7094)):
+        ThreadingTCPServer.__init__(self, address, _Handler)
+        self.gateway = gateway
+
+
+def main(argv=None):
+    from . import Integra
+
+    parser = argparse.ArgumentParser(
+        prog='python -m IntegraPy.gateway',
+        description='Serve one Integra panel to many local clients'
+    )
+    parser.add_argument('host', help='IP address of the ETHM-1 module')
+    parser.add_argument('--port', type=int, default=7094)
+    parser.add_argument('--listen', default='127.0.0.1')
+    parser.add_argument('--listen-port', type=int, default=7094)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    # the user code is not needed for forwarding frames
+    integra = Integra(
+        user_code=0,
+        host=args.host,
+        port=args.port,
+        transport=BlockingTransport(args.host, args.port, persistent=True)
+    )
+    server = GatewayServer(Gateway(integra), (args.listen, args.listen_port))
+    log.info('Serving %s on %s:%d', args.host, args.listen, args.listen_port)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
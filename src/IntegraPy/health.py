@@ -0,0 +1,287 @@
+# -*- coding: UTF-8 -*-
+'''
+Panel health tracking -- a circuit breaker per (host, port)
+
+After `failure_threshold` consecutive connection failures or timeouts
+the circuit opens and commands fail at once with CircuitOpen, without
+connecting. After a backoff (doubling up to `max_backoff`) a single
+trial command is let through (half-open), or a background prober
+checks if the module accepts connections again.
+'''
+import time
+import socket
+import logging
+from threading import Lock, Thread, Event
+
+from .exceptions import (
+    CircuitOpen, IntegraConnectionError, IntegraTimeout
+)
+from .framing import prepare_frame
+from .protocol import event_data
+from .transport import log_frame
+
+log = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class PanelHealth(object):
+    '''
+    Health state of a single panel
+    '''
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.state = CLOSED
+        self.failures = 0
+        self.last_error = None
+        self.last_success = None
+        self.last_failure = None
+        self.backoff = None
+        # monotonic time when a recovery attempt is allowed
+        self.retry_at = None
+
+    def __repr__(self):
+        return 'Panel {0.host}:{0.port} {0.state}, failures: {0.failures}'.\
+            format(self)
+
+
+def tcp_probe(host, port, timeout=2.0):
+    '''
+    Returns True if the module accepts connections
+    '''
+    try:
+        socket.create_connection((host, port), timeout).close()
+        return True
+    except (OSError, socket.error):
+        return False
+
+
+class HealthRegistry(object):
+    '''
+    Tracks health of many panels; share one instance among all clients
+    of a fleet
+    '''
+
+    def __init__(
+        self,
+        failure_threshold=3,
+        base_backoff=5.0,
+        max_backoff=300.0,
+        probe=tcp_probe
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.probe = probe
+
+        self._lock = Lock()
+        self._panels = {}
+        self._listeners = []
+        self._stop = Event()
+        self._prober = None
+
+    def get(self, host, port):
+        with self._lock:
+            return self._get(host, port)
+
+    def _get(self, host, port):
+        try:
+            return self._panels[(host, port)]
+        except KeyError:
+            health = self._panels[(host, port)] = PanelHealth(host, port)
+            return health
+
+    def panels(self):
+        with self._lock:
+            return list(self._panels.values())
+
+    def subscribe(self, callback):
+        '''
+        Registers callback(health, old_state, new_state) called on every
+        state transition
+        '''
+        self._listeners.append(callback)
+
+    def _transition(self, health, state):
+        old_state, health.state = health.state, state
+        log.info('Panel %s:%s %s -> %s',
+                 health.host, health.port, old_state, state)
+        return old_state
+
+    def _notify(self, health, old_state):
+        if old_state == health.state:
+            return
+        for callback in self._listeners:
+            try:
+                callback(health, old_state, health.state)
+            except Exception:
+                log.exception('Health listener failed')
+
+    def available(self, host, port):
+        '''
+        True unless the circuit is open; does not change state
+        '''
+        health = self.get(host, port)
+        return health.state == CLOSED or (
+            health.state == OPEN and time.monotonic() >= health.retry_at
+        )
+
+    def allow(self, host, port):
+        '''
+        Returns True if a command may be sent. An open circuit whose
+        backoff passed lets exactly one trial command through.
+        '''
+        with self._lock:
+            health = self._get(host, port)
+            if health.state == CLOSED:
+                return True
+            if health.state == HALF_OPEN:
+                return False
+            if time.monotonic() < health.retry_at:
+                return False
+            old_state = self._transition(health, HALF_OPEN)
+
+        self._notify(health, old_state)
+        return True
+
+    def record_success(self, host, port):
+        with self._lock:
+            health = self._get(host, port)
+            health.failures = 0
+            health.backoff = None
+            health.retry_at = None
+            health.last_success = time.time()
+            old_state = self._transition(health, CLOSED) \
+                if health.state != CLOSED else CLOSED
+
+        self._notify(health, old_state)
+
+    def record_failure(self, host, port, error=None):
+        with self._lock:
+            health = self._get(host, port)
+            health.failures += 1
+            health.last_error = error
+            health.last_failure = time.time()
+
+            old_state = health.state
+            if health.state == HALF_OPEN or (
+                health.state == CLOSED and
+                health.failures >= self.failure_threshold
+            ):
+                health.backoff = min(
+                    self.max_backoff,
+                    health.backoff * 2 if health.backoff
+                    else self.base_backoff
+                )
+                health.retry_at = time.monotonic() + health.backoff
+                self._transition(health, OPEN)
+
+        self._notify(health, old_state)
+
+    def release(self, host, port):
+        '''
+        Ends a trial command without a verdict, the next one may try again
+        '''
+        with self._lock:
+            health = self._get(host, port)
+            if health.state != HALF_OPEN:
+                return
+            health.retry_at = time.monotonic()
+            old_state = self._transition(health, OPEN)
+
+        self._notify(health, old_state)
+
+    def guard(self, transport):
+        '''
+        Wraps a transport so its commands go through this registry
+        '''
+        return GuardedTransport(transport, self)
+
+    def _probe_due(self):
+        now = time.monotonic()
+        for health in self.panels():
+            if health.state == OPEN and now >= health.retry_at:
+                if self.allow(health.host, health.port):
+                    if self.probe(health.host, health.port):
+                        self.record_success(health.host, health.port)
+                    else:
+                        self.record_failure(
+                            health.host, health.port,
+                            IntegraConnectionError('Probe failed')
+                        )
+
+    def start(self, interval=1.0):
+        '''
+        Starts a background thread probing panels with open circuits
+        '''
+        def run():
+            while not self._stop.wait(interval):
+                self._probe_due()
+
+        self._stop.clear()
+        self._prober = Thread(target=run)
+        self._prober.daemon = True
+        self._prober.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._prober:
+            self._prober.join()
+            self._prober = None
+
+
+class GuardedTransport(object):
+    '''
+    Fails fast for panels with an open circuit and records outcomes of
+    commands; connection errors and timeouts count as failures
+    '''
+
+    def __init__(self, transport, registry):
+        self.transport = transport
+        self.registry = registry
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+    def __setattr__(self, name, value):
+        if name in ('transport', 'registry'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.transport, name, value)
+
+    def exchange(self, frame, deadline=None):
+        host, port = self.transport.host, self.transport.port
+        if not self.registry.allow(host, port):
+            raise CircuitOpen('Panel {}:{} is unreachable'.format(host, port))
+
+        try:
+            event = self.transport.exchange(frame, deadline)
+        except (IntegraConnectionError, IntegraTimeout) as exc:
+            self.registry.record_failure(host, port, exc)
+            raise
+        except BaseException:
+            # e.g. cancelled, tells nothing about the panel
+            self.registry.release(host, port)
+            raise
+
+        # any response, even an error one, means the panel is alive
+        self.registry.record_success(host, port)
+        return event
+
+    def run_command(self, cmd, deadline=None):
+        command = prepare_frame(cmd)
+        log_frame('Sending command: ', command)
+        return event_data(self.exchange(command, deadline))
+
+    def close(self):
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,262 @@
+# -*- coding: UTF-8 -*-
+'''
+loadtest -- measures sustained command throughput and latency
+
+    python -m IntegraPy.loadtest <IP_ADDRESS_OF_THE_ETHM1_MODULE>
+    python -m IntegraPy.loadtest --simulate --concurrency 4 --json
+'''
+from __future__ import print_function, division
+import sys
+import json
+import math
+import random
+import argparse
+from threading import Thread, Lock
+from time import sleep
+
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+from . import Integra
+from .constants import BUSY
+from .encryption import EncryptedTransport
+from .transport import BlockingTransport
+
+
+DEFAULT_MIX = 'violated_zones:4,armed_partitions:2,active_outputs:2,version:1'
+
+REPORT = '''\
+Commands:     {commands} in {duration:.1f} s
+Throughput:   {throughput:.1f} commands/s
+Latency p50:  {p50:.1f} ms
+Latency p95:  {p95:.1f} ms
+Latency p99:  {p99:.1f} ms
+Busy rate:    {busy_rate:.2%}
+Errors:       {errors}
+'''
+
+
+def parse_mix(mix):
+    '''
+    Parses "name:weight,name:weight" into a list of (name, weight)
+    '''
+    result = []
+    for item in mix.split(','):
+        name, _, weight = item.partition(':')
+        result.append((name.strip(), float(weight or 1)))
+    return result
+
+
+def percentile(values, pct):
+    '''
+    Nearest-rank percentile of sorted values
+    '''
+    if not values:
+        return 0.0
+    rank = int(math.ceil(pct / 100 * len(values))) - 1
+    return values[min(max(rank, 0), len(values) - 1)]
+
+
+class BusyCounter(object):
+    '''
+    Counts responses and "Busy!" responses; used as Integra's recorder
+    '''
+
+    def __init__(self):
+        self.lock = Lock()
+        self.responses = 0
+        self.busy = 0
+
+    def record(self, direction, frame):
+        if not direction:
+            return
+        with self.lock:
+            self.responses += 1
+            if frame[0:8] == BUSY:
+                self.busy += 1
+
+
+class LoadTest(object):
+
+    def __init__(
+        self,
+        host,
+        port=7094,
+        mix=DEFAULT_MIX,
+        concurrency=1,
+        rate=None,
+        duration=10.0,
+        delay=0.002,
+        max_attempts=3,
+        persistent=False,
+        integration_key=None
+    ):
+        self.host = host
+        self.port = port
+        self.mix = parse_mix(mix)
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.persistent = persistent
+        self.integration_key = integration_key
+
+        self.counter = BusyCounter()
+        self.latencies = []
+        self.errors = {}
+        self._lock = Lock()
+
+    def _worker(self, seed):
+        rnd = random.Random(seed)
+        names = [name for name, _ in self.mix]
+        weights = [weight for _, weight in self.mix]
+        options = dict(
+            persistent=self.persistent,
+            delay=self.delay,
+            max_attempts=self.max_attempts,
+            recorder=self.counter
+        )
+        if self.integration_key is None:
+            transport = BlockingTransport(self.host, self.port, **options)
+        else:
+            transport = EncryptedTransport(
+                self.host, self.port,
+                integration_key=self.integration_key, **options
+            )
+        integra = Integra(
+            user_code=0, host=self.host, port=self.port, transport=transport
+        )
+        # every worker sends its share of the target rate
+        interval = self.concurrency / self.rate if self.rate else 0
+        start = perf_counter()
+        next_time = start
+
+        while perf_counter() - start < self.duration:
+            if interval:
+                next_time += interval
+                pause = next_time - perf_counter()
+                if pause > 0:
+                    sleep(pause)
+
+            name = rnd.choices(names, weights)[0]
+            sent = perf_counter()
+            try:
+                integra.execute(name)
+            except Exception as exc:
+                with self._lock:
+                    key = '{}: {}'.format(name, exc)
+                    self.errors[key] = self.errors.get(key, 0) + 1
+            else:
+                latency = perf_counter() - sent
+                with self._lock:
+                    self.latencies.append(latency)
+
+        integra.transport.close()
+
+    def run(self):
+        threads = [
+            Thread(target=self._worker, args=(seed,))
+            for seed in range(self.concurrency)
+        ]
+        start = perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - start
+
+        latencies = sorted(self.latencies)
+        errors = sum(self.errors.values())
+        return dict(
+            commands=len(latencies) + errors,
+            duration=elapsed,
+            throughput=len(latencies) / elapsed,
+            p50=percentile(latencies, 50) * 1000,
+            p95=percentile(latencies, 95) * 1000,
+            p99=percentile(latencies, 99) * 1000,
+            busy_rate=(
+                self.counter.busy / self.counter.responses
+                if self.counter.responses else 0.0
+            ),
+            errors=errors,
+            error_details=self.errors
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m IntegraPy.loadtest',
+        description='Measure command throughput and latency of a panel'
+    )
+    parser.add_argument('host', nargs='?', help='IP of the ETHM-1 module')
+    parser.add_argument('--port', type=int, default=7094)
+    parser.add_argument(
+        '--simulate', action='store_true',
+        help='run against a local simulated panel'
+    )
+    parser.add_argument(
+        '--mix', default=DEFAULT_MIX,
+        help='weighted names of commands without arguments, e.g. "{}"'.format(
+            DEFAULT_MIX
+        )
+    )
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument(
+        '--rate', type=float, help='target commands per second'
+    )
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--delay', type=float, default=0.002)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument(
+        '--persistent', action='store_true',
+        help='keep one connection per worker instead of one per command'
+    )
+    parser.add_argument(
+        '--integration-key', help='use encrypted integration (ETHM-1 Plus)'
+    )
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.host and not args.simulate:
+        parser.error('give a host or --simulate')
+
+    server = None
+    host, port = args.host, args.port
+    if args.simulate:
+        from .simulator import SimulatedPanel
+
+        server = SimulatedPanel(integration_key=args.integration_key)
+        Thread(target=server.serve_forever).start()
+        host, port = server.server_address
+
+    try:
+        result = LoadTest(
+            host, port,
+            mix=args.mix,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            duration=args.duration,
+            delay=args.delay,
+            max_attempts=args.max_attempts,
+            persistent=args.persistent,
+            integration_key=args.integration_key
+        ).run()
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    if args.json:
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        print(REPORT.format(**result), end='')
+        for error, count in sorted(result['error_details'].items()):
+            print('  {:6d} x {}'.format(count, error))
+
+
+if __name__ == '__main__':
+    main()
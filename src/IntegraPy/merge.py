@@ -0,0 +1,194 @@
+# -*- coding: UTF-8 -*-
+'''
+One chronological stream of events from many panels
+
+merge_logs walks the logs of many panels at once, merging them on the
+event time with a heap holding one event per panel. MergedEventStream
+follows new events of many panels; EventMerger holds them back until
+every panel has been read past their time, or for at most `window`,
+and publishes them in order to an EventBus.
+'''
+import heapq
+import time
+import logging
+from datetime import timedelta
+from itertools import count
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from .bus import EventBus, EventFollower
+from .exceptions import IntegraError
+from .polling import Poller
+
+log = logging.getLogger(__name__)
+
+
+def merge_logs(integras, limit=None):
+    '''
+    Yields events of all panels, newest first; reads at most `limit`
+    events of each panel and only as fast as they are consumed
+    '''
+    return heapq.merge(
+        *[integra.iter_events(limit=limit) for integra in integras],
+        key=lambda evt: evt.date_key,
+        reverse=True
+    )
+
+
+class EventMerger(object):
+    '''
+    Reorders events of many sources arriving in bursts. Events of a
+    single source must come in order. An event is released when every
+    source has been seen past its time (see advance) or when an event
+    newer by `window` arrives; events older than the last released one
+    are released at once and counted as late.
+    '''
+
+    def __init__(self, window=timedelta(minutes=5)):
+        self.window = window
+        self.late = 0
+        self.newest = None
+        self.released = None
+
+        self._heap = []
+        self._order = count()
+        self._watermarks = {}
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add_source(self, source):
+        self._watermarks.setdefault(source, None)
+
+    def advance(self, source, timestamp):
+        '''
+        Promises that no event of the source is older than `timestamp`
+        '''
+        with self._lock:
+            self._advance(source, timestamp)
+
+    def _advance(self, source, timestamp):
+        watermark = self._watermarks.get(source)
+        if watermark is None or timestamp > watermark:
+            self._watermarks[source] = timestamp
+
+    def push(self, source, evt):
+        timestamp = evt.timestamp
+        with self._lock:
+            self._advance(source, timestamp)
+            if self.newest is None or timestamp > self.newest:
+                self.newest = timestamp
+            if self.released is not None and timestamp < self.released:
+                self.late += 1
+            heapq.heappush(self._heap, (timestamp, next(self._order), evt))
+
+    def pop_ready(self):
+        '''
+        Returns released events, oldest first
+        '''
+        with self._lock:
+            if not self._heap:
+                return []
+
+            watermarks = list(self._watermarks.values())
+            threshold = self.newest - self.window
+            if None not in watermarks:
+                threshold = max(threshold, min(watermarks))
+            return self._release(threshold)
+
+    def flush(self):
+        '''
+        Returns all held events, oldest first
+        '''
+        with self._lock:
+            return self._release(None)
+
+    def _release(self, threshold):
+        heap = self._heap
+        events = []
+        while heap and (threshold is None or heap[0][0] <= threshold):
+            timestamp, _, evt = heapq.heappop(heap)
+            events.append(evt)
+            if self.released is None or timestamp > self.released:
+                self.released = timestamp
+        return events
+
+
+class _Intake(object):
+    '''
+    Takes the place of the bus of an EventFollower
+    '''
+
+    def __init__(self, merger, source):
+        self.merger = merger
+        self.source = source
+
+    def publish(self, evt):
+        self.merger.push(self.source, evt)
+
+
+class MergedEventStream(Poller):
+    '''
+    Follows new events of many panels and publishes them to `bus` in
+    chronological order; memory is bounded by events of `window`
+    '''
+
+    def __init__(
+        self,
+        integras,
+        window=timedelta(minutes=5),
+        interval=1.0,
+        backlog=0,
+        bus=None,
+        max_workers=8
+    ):
+        super(MergedEventStream, self).__init__()
+        self.merger = EventMerger(window)
+        self.bus = bus or EventBus()
+        self.interval = interval
+        self.max_workers = max_workers
+        self.followers = []
+        for integra in integras:
+            self.merger.add_source(integra)
+            self.followers.append(EventFollower(
+                integra, _Intake(self.merger, integra), backlog=backlog
+            ))
+
+    def _poll(self, follower):
+        integra = follower.integra
+        try:
+            follower.poll()
+            # later events can not be older than the panel clock now
+            now = integra.clock.get_time().replace(second=0)
+        except IntegraError as exc:
+            log.warning('Following events of %s:%s failed: %s',
+                        integra.host, integra.port, exc)
+            return
+        self.merger.advance(integra, now)
+
+    def poll(self):
+        '''
+        Reads new events of all panels; returns the number published
+        '''
+        if len(self.followers) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(self._poll, self.followers))
+        else:
+            for follower in self.followers:
+                self._poll(follower)
+
+        events = self.merger.pop_ready()
+        for evt in events:
+            self.bus.publish(evt)
+        return len(events)
+
+    def _step(self):
+        started = time.monotonic()
+        self.poll()
+        return self.interval - (time.monotonic() - started)
+
+    def stop(self):
+        super(MergedEventStream, self).stop()
+        for evt in self.merger.flush():
+            self.bus.publish(evt)
@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+'''
+Background polling loop shared by schedulers and followers
+'''
+from threading import Thread, Event
+
+
+class Poller(object):
+    '''
+    Runs `_step` in a background thread between start and stop;
+    `_step` returns the seconds to wait before it is run again
+    '''
+
+    def __init__(self):
+        self._stop = Event()
+        self._thread = None
+
+    def _step(self):
+        raise NotImplementedError
+
+    def run(self):
+        '''
+        Polls until stop is called
+        '''
+        while not self._stop.is_set():
+            self._stop.wait(max(self._step(), 0))
+
+    def start(self):
+        self._stop.clear()
+        self._thread = Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,132 @@
+# -*- coding: UTF-8 -*-
+'''
+Sans-I/O integration protocol core
+
+IntegraProtocol does no I/O: frames to send are returned to the caller,
+received bytes are fed in with receive_data and parsed responses come
+out of next_event. Transports (see transport.py) move the bytes.
+'''
+from collections import deque
+
+from .constants import BUSY, FOOTER
+from .exceptions import IntegraBusy, ProtocolError
+from .framing import prepare_frame, check_response
+
+
+class Response(object):
+    '''
+    A valid response; `data` is the response without code and checksum
+    '''
+
+    def __init__(self, command, frame, data):
+        self.command = command
+        self.frame = frame
+        self.data = data
+
+    def __repr__(self):
+        return 'Response to {:02X}: {!r}'.format(self.command[2], self.data)
+
+
+class Busy(object):
+    '''
+    Integra refused the command as it came too early
+    '''
+
+    def __init__(self, command):
+        self.command = command
+        self.frame = BUSY
+
+    def __repr__(self):
+        return 'Busy, command {:02X}'.format(self.command[2])
+
+
+class Error(object):
+    '''
+    An invalid response; `error` is the exception raised by validation
+    '''
+
+    def __init__(self, command, frame, error):
+        self.command = command
+        self.frame = frame
+        self.error = error
+
+    def __repr__(self):
+        return 'Error: {}'.format(self.error)
+
+
+def event_data(event):
+    '''
+    Returns data of a Response, raises for Busy and Error
+    '''
+    if isinstance(event, Busy):
+        raise IntegraBusy('Integra is busy')
+    if isinstance(event, Error):
+        raise event.error
+    return event.data
+
+
+class IntegraProtocol(object):
+    '''
+    Matches response frames to sent commands, in order
+    '''
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pending = deque()
+
+    @property
+    def pending(self):
+        '''
+        Number of commands awaiting response
+        '''
+        return len(self._pending)
+
+    def send_command(self, cmd):
+        '''
+        Returns a frame to send for a command given in hex
+        '''
+        return self.send_frame(prepare_frame(cmd))
+
+    def send_frame(self, frame):
+        '''
+        Registers an already prepared frame as sent
+        '''
+        frame = bytes(frame)
+        self._pending.append(frame)
+        return frame
+
+    def receive_data(self, data):
+        self._buffer += data
+
+    def next_event(self):
+        '''
+        Returns the next Response, Busy or Error; None if more data is
+        needed to complete a frame
+        '''
+        buf = self._buffer
+        if buf[:len(BUSY)] == BUSY[:len(buf)]:
+            if len(buf) < len(BUSY):
+                return None
+
+            del buf[:len(BUSY)]
+            return Busy(self._next_command())
+
+        end = buf.find(FOOTER)
+        if end < 0:
+            return None
+
+        end += len(FOOTER)
+        frame = bytes(buf[:end])
+        del buf[:end]
+
+        command = self._next_command()
+        if command is None:
+            return Error(None, frame, ProtocolError('Unexpected frame'))
+
+        try:
+            return Response(command, frame, check_response(command, frame))
+        except Exception as exc:
+            return Error(command, frame, exc)
+
+    def _next_command(self):
+        return self._pending.popleft() if self._pending else None
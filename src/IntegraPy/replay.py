@@ -0,0 +1,149 @@
+# -*- coding: UTF-8 -*-
+'''
+Raw frame capture -- an append-only binary log of request and response
+frames and a memory mapped reader able to replay the captured traffic
+through the regular response validation and command decoders
+'''
+import os
+import mmap
+import time
+from struct import Struct
+from threading import Lock
+
+from .constants import BUSY
+from .commands import COMMANDS
+from .framing import check_response
+
+
+MAGIC = b'IPYR'
+VERSION = 1
+
+# frame directions
+REQUEST = 0
+RESPONSE = 1
+
+# magic, version
+FILE_HEADER = Struct('<4sH')
+# timestamp, direction, frame length
+RECORD = Struct('<dBH')
+
+# decoders of command responses; the key is the command code
+DECODERS = dict((command.code, command) for command in COMMANDS.values())
+
+
+class FrameRecorder(object):
+    '''
+    Appends timestamped frames to a capture file through a buffered
+    writer; pass an instance as Integra's `recorder`
+    '''
+
+    def __init__(self, path, buffering=64 * 1024):
+        self.path = path
+        self._lock = Lock()
+        self._file = open(path, 'ab', buffering)
+
+        if self._file.tell() == 0:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+
+    def record(self, direction, frame, timestamp=None):
+        header = RECORD.pack(
+            time.time() if timestamp is None else timestamp,
+            direction,
+            len(frame)
+        )
+        with self._lock:
+            self._file.write(header)
+            self._file.write(frame)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FrameLog(object):
+    '''
+    Memory mapped reader of a capture file
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+
+        magic, version = FILE_HEADER.unpack(
+            self._file.read(FILE_HEADER.size)
+        )
+        if magic != MAGIC:
+            raise Exception('Not a frame capture: {}'.format(path))
+
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_READ
+        ) if self._size > FILE_HEADER.size else b''
+
+    def __iter__(self):
+        '''
+        Yields (timestamp, direction, frame) tuples
+        '''
+        offset = FILE_HEADER.size
+        # a truncated record at the end is left by an interrupted writer
+        while offset + RECORD.size <= self._size:
+            timestamp, direction, length = RECORD.unpack_from(
+                self._map, offset
+            )
+            offset += RECORD.size
+            if offset + length > self._size:
+                break
+
+            yield timestamp, direction, self._map[offset:offset + length]
+            offset += length
+
+    def exchanges(self):
+        '''
+        Yields (timestamp, request, response) tuples; commands answered
+        with "Busy!" are skipped, as they were repeated
+        '''
+        pending = None
+        for timestamp, direction, frame in self:
+            if direction == REQUEST:
+                pending = (timestamp, frame)
+            elif pending and frame[0:8] != BUSY:
+                yield pending + (frame,)
+                pending = None
+
+    def replay(self):
+        '''
+        Validates and decodes captured responses. Yields
+        (timestamp, command code, result) tuples; the result is a decoded
+        record, raw response data or the exception raised by validation
+        '''
+        for timestamp, request, response in self.exchanges():
+            code = request[2]
+            try:
+                data = check_response(request, response)
+            except Exception as exc:
+                yield timestamp, code, exc
+                continue
+
+            decoder = DECODERS.get(code)
+            yield timestamp, code, decoder.parse(data) if decoder else data
+
+    def close(self):
+        if self._size > FILE_HEADER.size:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
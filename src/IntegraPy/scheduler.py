@@ -0,0 +1,225 @@
+# -*- coding: UTF-8 -*-
+'''
+Adaptive state polling
+
+Every state group (zones, partitions, outputs) of every panel is polled
+at its own interval: it drops to `min_interval` as soon as a change is
+seen and doubles on every quiet poll up to `max_interval`. A token
+bucket per panel keeps the number of commands per second within
+`budget`. Changes are passed to subscribers as StateChange objects and
+raw bitmaps, optionally, to a StatePublisher (see sharedstate.py).
+'''
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .commands import COMMANDS
+from .exceptions import IntegraError
+from .polling import Poller
+
+log = logging.getLogger(__name__)
+
+# state group -> registered command
+GROUPS = {
+    'zones': 'violated_zones',
+    'partitions': 'armed_partitions',
+    'outputs': 'active_outputs',
+}
+
+
+class StateChange(object):
+    '''
+    A difference between two consecutive polls of a state group;
+    `previous` is None for the first poll
+    '''
+
+    def __init__(self, integra, group, previous, current, timestamp):
+        self.integra = integra
+        self.group = group
+        self.previous = previous
+        self.current = current
+        self.timestamp = timestamp
+
+    @property
+    def added(self):
+        return sorted(set(self.current) - set(self.previous or ()))
+
+    @property
+    def removed(self):
+        return sorted(set(self.previous or ()) - set(self.current))
+
+    def __repr__(self):
+        return '{0.integra.host}:{0.integra.port} {0.group} ' \
+            '+{0.added} -{0.removed}'.format(self)
+
+
+class _Poll(object):
+    '''
+    Polling state of a single group of a single panel
+    '''
+
+    def __init__(self, integra, group, command, interval, publisher):
+        self.integra = integra
+        self.group = group
+        self.command = COMMANDS[command]
+        self.publisher = publisher
+        self.interval = interval
+        self.due = 0.0
+        self.state = None
+
+
+class _Budget(object):
+    '''
+    Token bucket: `rate` commands per second, bursts up to `rate` but
+    at least one command, so rates below one command per second work
+    '''
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = None
+
+    def take(self, now):
+        '''
+        Takes a token; returns 0 or seconds to wait for one
+        '''
+        if self.updated is not None:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class PollScheduler(Poller):
+    '''
+    Polls state groups of many panels, adapting the rate to activity.
+    Panels are polled in parallel (up to `max_workers`), groups of one
+    panel one after another.
+    '''
+
+    def __init__(
+        self,
+        groups=None,
+        min_interval=0.5,
+        max_interval=30.0,
+        backoff=2.0,
+        budget=4.0,
+        max_workers=8
+    ):
+        super(PollScheduler, self).__init__()
+        self.groups = dict(groups or GROUPS)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        # commands per second per panel
+        self.budget = budget
+        self.max_workers = max_workers
+
+        self._polls = []
+        self._budgets = {}
+        self._listeners = []
+
+    def add(self, integra, groups=None, publisher=None):
+        '''
+        Starts polling a panel; all groups by default. Raw state of the
+        default groups is also published to `publisher`, if given.
+        '''
+        self._budgets[integra] = _Budget(self.budget)
+        for group in groups or sorted(self.groups):
+            self._polls.append(_Poll(
+                integra, group, self.groups[group], self.min_interval,
+                publisher
+            ))
+
+    def remove(self, integra):
+        self._polls = [
+            poll for poll in self._polls if poll.integra is not integra
+        ]
+        self._budgets.pop(integra, None)
+
+    def subscribe(self, callback):
+        '''
+        Registers callback(change) called with every StateChange
+        '''
+        self._listeners.append(callback)
+
+    def _emit(self, change):
+        for callback in self._listeners:
+            try:
+                callback(change)
+            except Exception:
+                log.exception('State change listener failed')
+
+    def _poll(self, poll, now):
+        command = poll.command
+        try:
+            data = poll.integra.run_command(command.encode())
+        except IntegraError as exc:
+            # an unreachable panel is polled as rarely as a quiet one
+            log.warning('Polling %s of %s:%s failed: %s', poll.group,
+                        poll.integra.host, poll.integra.port, exc)
+            poll.interval = self.max_interval
+            poll.due = now + poll.interval
+            return
+
+        if poll.publisher is not None and poll.group in GROUPS:
+            poll.publisher.publish(**{poll.group: data})
+
+        state = command.parse(data)
+        if state != poll.state:
+            change = StateChange(
+                poll.integra, poll.group, poll.state, state, time.time()
+            )
+            poll.state = state
+            poll.interval = self.min_interval
+            self._emit(change)
+        else:
+            poll.interval = min(
+                poll.interval * self.backoff, self.max_interval
+            )
+        poll.due = now + poll.interval
+
+    def _poll_panel(self, polls, now):
+        budget = self._budgets[polls[0].integra]
+        for poll in polls:
+            wait = budget.take(now)
+            if wait:
+                # over budget, the rest waits for tokens
+                poll.due = now + wait
+                continue
+            self._poll(poll, now)
+
+    def run_once(self, now=None):
+        '''
+        Polls everything due; returns seconds until the next poll is due
+        '''
+        now = time.monotonic() if now is None else now
+
+        panels = {}
+        for poll in self._polls:
+            if poll.due <= now:
+                panels.setdefault(poll.integra, []).append(poll)
+
+        if len(panels) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(
+                    lambda polls: self._poll_panel(polls, now),
+                    panels.values()
+                ))
+        else:
+            for polls in panels.values():
+                self._poll_panel(polls, now)
+
+        if not self._polls:
+            return self.max_interval
+        return max(
+            min(poll.due for poll in self._polls) - time.monotonic(), 0
+        )
+
+    def _step(self):
+        return self.run_once()
@@ -0,0 +1,193 @@
+# -*- coding: UTF-8 -*-
+'''
+Panel state shared between processes through memory
+
+A poller publishes raw bitmaps of violated zones (00), armed partitions
+(0A) and active outputs (17) into a small memory mapped file, by default
+in /dev/shm, one per panel. Any number of local processes read them
+without locks and without talking to the panel.
+
+Layout (little endian, fixed):
+    magic 'IPYS', version (H), reserved (H),
+    sequence (Q), timestamp (d),
+    zones (32s), partitions (4s), outputs (32s)
+
+The sequence works as a seqlock: it is odd while the writer updates the
+segment, so a reader retries when it is odd or changed during the read.
+There must be a single writer per segment; a writer which died while
+updating it leaves the sequence odd until a new one is started.
+'''
+import os
+import mmap
+import time
+import tempfile
+from struct import Struct
+
+from .exceptions import IntegraTimeout
+from .framing import set_bits_positions
+
+MAGIC = b'IPYS'
+VERSION = 1
+LAYOUT = Struct('<4sHHQd32s4s32s')
+SEQUENCE = Struct('<Q')
+SEQUENCE_OFFSET = 8
+
+
+def state_path(host, port=7094, directory=None):
+    '''
+    Default location of the segment of a panel
+    '''
+    if directory is None:
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') \
+            else tempfile.gettempdir()
+    return os.path.join(
+        directory, 'integrapy-{}-{}.state'.format(host, port)
+    )
+
+
+class StateSnapshot(object):
+    '''
+    A consistent copy of the segment; bitmaps are raw response data
+    '''
+
+    def __init__(self, sequence, timestamp, zones, partitions, outputs):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.zones = zones
+        self.partitions = partitions
+        self.outputs = outputs
+
+    @property
+    def violated_zones(self):
+        return set_bits_positions(self.zones)
+
+    @property
+    def armed_partitions(self):
+        return set_bits_positions(self.partitions)
+
+    @property
+    def active_outputs(self):
+        return set_bits_positions(self.outputs)
+
+    def __repr__(self):
+        return 'State #{0.sequence} at {0.timestamp}'.format(self)
+
+
+class StatePublisher(object):
+    '''
+    Writes the state segment of one panel
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, LAYOUT.size)
+            self._map = mmap.mmap(fd, LAYOUT.size)
+        finally:
+            os.close(fd)
+
+        magic, version, _, sequence, timestamp, zones, partitions, \
+            outputs = LAYOUT.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            sequence, timestamp = 0, 0.0
+            zones = partitions = outputs = b''
+        # continue an even sequence, readers must see it grow
+        self.sequence = sequence + (sequence & 1)
+        self._values = dict(
+            timestamp=timestamp,
+            zones=zones,
+            partitions=partitions,
+            outputs=outputs
+        )
+        self._write()
+
+    def _write(self):
+        values = self._values
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self.sequence + 1)
+        LAYOUT.pack_into(
+            self._map, 0, MAGIC, VERSION, 0, self.sequence + 1,
+            values['timestamp'], values['zones'], values['partitions'],
+            values['outputs']
+        )
+        self.sequence += 2
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self.sequence)
+
+    def publish(self, zones=None, partitions=None, outputs=None,
+                timestamp=None):
+        '''
+        Updates given bitmaps (raw response data); others are kept
+        '''
+        for group, data in (
+            ('zones', zones), ('partitions', partitions), ('outputs', outputs)
+        ):
+            if data is not None:
+                self._values[group] = bytes(data)
+        self._values['timestamp'] = time.time() if timestamp is None \
+            else timestamp
+        self._write()
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StateReader(object):
+    '''
+    Reads snapshots of the state segment of one panel
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(
+                f.fileno(), LAYOUT.size, access=mmap.ACCESS_READ
+            )
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError('{} is not a state segment'.format(path))
+
+    @property
+    def sequence(self):
+        '''
+        Current sequence; cheap check whether anything changed
+        '''
+        return SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+
+    def snapshot(self, timeout=1.0):
+        '''
+        Returns a consistent StateSnapshot, retrying while it is written;
+        raises IntegraTimeout if it is still being written after `timeout`
+        seconds (the writer died in the middle of an update)
+        '''
+        deadline = time.monotonic() + timeout
+        while True:
+            before = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                if time.monotonic() > deadline:
+                    raise IntegraTimeout(
+                        '{} is being written for over {}s'.format(
+                            self.path, timeout
+                        )
+                    )
+                time.sleep(0)
+                continue
+
+            values = LAYOUT.unpack_from(self._map)
+            after = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+            if before == after:
+                return StateSnapshot(before, *values[4:])
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,220 @@
+# -*- coding: UTF-8 -*-
+'''
+simulator -- a localhost stand-in for an ETHM-1 module
+
+Answers the integration protocol from in-memory state, optionally
+with latency and "Busy!" responses, for load tests and client tests
+without a panel.
+'''
+import time
+import random
+import argparse
+from binascii import hexlify
+from datetime import datetime
+from threading import Lock
+
+try:
+    from socketserver import ThreadingTCPServer, BaseRequestHandler
+except ImportError:
+    from SocketServer import ThreadingTCPServer, BaseRequestHandler
+
+from .constants import BUSY, FOOTER
+from .framing import prepare_frame, bytes_with_bits_set, set_bits_positions
+
+
+VERSION = bytearray([3]) + b'12020170830' + bytearray([1, 255])
+# index of the newest event in the simulated log
+NEWEST_EVENT = 0x000100
+
+
+def _bcd(value):
+    return int(str(value), 16)
+
+
+class PanelState(object):
+    '''
+    State of a simulated panel; commands change it like a real panel
+    '''
+
+    def __init__(self):
+        self.lock = Lock()
+        self.violated_zones = set([1])
+        self.armed_partitions = set()
+        self.active_outputs = set()
+        self.events = NEWEST_EVENT
+
+    def _time(self):
+        now = datetime.now()
+        return bytearray([
+            _bcd(now.year // 100), _bcd(now.year % 100), _bcd(now.month),
+            _bcd(now.day), _bcd(now.hour), _bcd(now.minute),
+            _bcd(now.second), now.weekday()
+        ])
+
+    def _event(self, index):
+        if index > self.events:
+            index = self.events + 1
+        if index <= 1:
+            # empty record - the beginning of the log
+            return bytearray(8) + b'\x00\x00\x00\xff\xff\xff'
+
+        now = datetime.now()
+        minutes = now.hour * 60 + now.minute
+        # not monitored, present, not empty, arming class, partition 1
+        return bytearray([
+            0x3F | (now.year % 4) << 6,
+            now.day | 2 << 5,
+            (minutes >> 8) | now.month << 4,
+            minutes & 0xFF,
+            1 << 3, 0x02, 0x01, 0x01,
+        ]) + bytearray([
+            (index - 1) >> 16, ((index - 1) >> 8) & 0xFF, (index - 1) & 0xFF
+        ]) + b'\xff\xff\xff'
+
+    def respond(self, code, payload):
+        '''
+        Returns response data (without the code) to a command
+        '''
+        with self.lock:
+            if code == 0x00:
+                return bytes_with_bits_set(self.violated_zones, 128)
+            elif code in (0x09, 0x0A):
+                # arming takes no exit delay here
+                return bytes_with_bits_set(self.armed_partitions, 32)
+            elif code == 0x17:
+                return bytes_with_bits_set(self.active_outputs, 128)
+            elif code == 0x1A:
+                return self._time()
+            elif code == 0x7E:
+                return VERSION
+            elif code == 0x8C:
+                index = int(hexlify(payload[:3]), 16)
+                return self._event(index)
+            elif code == 0xEE:
+                kind, number = bytearray(payload[:2])
+                name = 'Object {}-{}'.format(kind, number).encode()
+                return bytearray([kind, number, 0]) + name.ljust(16) + b'\x00'
+
+            bitmap = set_bits_positions(payload[8:])
+            if 0x80 <= code <= 0x83:
+                self.armed_partitions |= bitmap
+            elif code == 0x84:
+                self.armed_partitions -= bitmap
+            elif code == 0x88:
+                self.active_outputs |= bitmap
+            elif code == 0x89:
+                self.active_outputs -= bitmap
+            elif code == 0x91:
+                self.active_outputs ^= bitmap
+            else:
+                return None
+
+            return b''
+
+
+class _Handler(BaseRequestHandler):
+
+    def handle(self):
+        server = self.server
+        buf = b''
+
+        cipher = server.cipher
+        id_s = 0
+
+        while True:
+            data = self.request.recv(1024)
+            if not data:
+                break
+
+            buf += data
+            if cipher is not None:
+                # length prefixed encrypted messages, a frame in each
+                while buf and len(buf) > bytearray(buf)[0]:
+                    end = bytearray(buf)[0] + 1
+                    message, buf = buf[1:end], buf[end:]
+                    counter, id_r, _, frame = cipher.open(message)
+                    id_s = (id_s + 1) & 0xFF
+                    self.request.sendall(cipher.seal(
+                        counter, id_s, id_r, server.answer(frame)
+                    ))
+                continue
+
+            while FOOTER in buf:
+                end = buf.index(FOOTER) + len(FOOTER)
+                frame, buf = buf[:end], buf[end:]
+                self.request.sendall(server.answer(frame))
+
+
+class SimulatedPanel(ThreadingTCPServer):
+    '''
+    A TCP server answering the integration protocol; port 0 picks
+    a free port (see server_address). Given the integration key it
+    speaks the encrypted protocol of ETHM-1 Plus.
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        address=('127.0.0.1', 0),
+        latency=0.0,
+        busy_rate=0.0,
+        state=None,
+        integration_key=None
+    ):
+        ThreadingTCPServer.__init__(self, address, _Handler)
+        self.latency = latency
+        self.busy_rate = busy_rate
+        self.state = PanelState() if state is None else state
+        self.cipher = None
+        if integration_key is not None:
+            from .encryption import SatelCipher
+
+            self.cipher = SatelCipher(integration_key)
+
+    def answer(self, frame):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.busy_rate and random.random() < self.busy_rate:
+            return BUSY
+
+        data = bytearray(frame[2:-2]).replace(b'\xFE\xF0', b'\xFE')
+        code, payload = data[0], data[1:-2]
+
+        resp = self.state.respond(code, payload)
+        if resp is None:
+            # EF 08 - command not supported
+            return prepare_frame('EF08')
+        if not resp:
+            # EF 00 - command accepted
+            return prepare_frame('EF00')
+
+        return prepare_frame(hexlify(bytearray([code]) + resp))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m IntegraPy.simulator',
+        description='Serve a simulated Integra panel'
+    )
+    parser.add_argument('--listen', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7094)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--busy-rate', type=float, default=0.0)
+    parser.add_argument('--integration-key', help='speak encrypted protocol')
+    args = parser.parse_args(argv)
+
+    server = SimulatedPanel(
+        (args.listen, args.port), args.latency, args.busy_rate,
+        integration_key=args.integration_key
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: UTF-8 -*-
+'''
+In-memory event store indexed by class, partition, code and date
+'''
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from .constants import EVENT_CLASSES
+from .framing import date_key
+
+
+CLASS_NUMBERS = dict((name, num) for num, name in EVENT_CLASSES.items())
+
+
+class EventStore(object):
+    '''
+    Keeps events fetched from the panel and answers queries from indexes
+    instead of scanning all events
+    '''
+
+    def __init__(self, events=()):
+        self._events = []
+        self._positions = {}
+        self._by_class = defaultdict(list)
+        self._by_partition = defaultdict(list)
+        self._by_code = defaultdict(list)
+        # sorted (date key, position) tuples
+        self._by_date = []
+
+        self.extend(events)
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def __contains__(self, event_index):
+        return event_index in self._positions
+
+    def get(self, event_index):
+        pos = self._positions.get(event_index)
+        return None if pos is None else self._events[pos]
+
+    def add(self, evt):
+        '''
+        Adds an event; returns False if it is already stored
+        '''
+        if evt.event_index in self._positions:
+            return False
+
+        pos = len(self._events)
+        self._events.append(evt)
+        self._positions[evt.event_index] = pos
+        self._by_class[evt._class].append(pos)
+        self._by_partition[evt.partition].append(pos)
+        self._by_code[evt.code].append(pos)
+        # incremental syncs bring newer events, inserted near the end
+        insort(self._by_date, (evt.date_key, pos))
+
+        return True
+
+    def extend(self, events):
+        '''
+        Adds many events; returns number of events actually added
+        '''
+        return sum(1 for evt in events if self.add(evt))
+
+    def _date_range(self, since, until):
+        start = 0 if since is None else \
+            bisect_left(self._by_date, (date_key(since),))
+        end = len(self._by_date) if until is None else \
+            bisect_left(self._by_date, (date_key(until),))
+
+        return [pos for _, pos in self._by_date[start:end]]
+
+    def query(
+        self,
+        event_class=None,
+        partition=None,
+        code=None,
+        restore=None,
+        since=None,
+        until=None,
+        limit=None
+    ):
+        '''
+        Returns matching events, newest first. `event_class` is a class
+        number or name, `since` is inclusive, `until` exclusive.
+        '''
+        if event_class in CLASS_NUMBERS:
+            event_class = CLASS_NUMBERS[event_class]
+
+        candidates = [range(len(self._events))]
+        for index, value in (
+            (self._by_class, event_class),
+            (self._by_partition, partition),
+            (self._by_code, code)
+        ):
+            if value is not None:
+                candidates.append(index.get(value, []))
+
+        if since is not None or until is not None:
+            candidates.append(self._date_range(since, until))
+
+        since = since and date_key(since)
+        until = until and date_key(until)
+
+        # only the smallest candidate list is scanned
+        result = []
+        for pos in min(candidates, key=len):
+            evt = self._events[pos]
+            if (
+                (event_class is None or evt._class == event_class) and
+                (partition is None or evt.partition == partition) and
+                (code is None or evt.code == code) and
+                (restore is None or bool(evt.restore) == bool(restore)) and
+                (since is None or evt.date_key >= since) and
+                (until is None or evt.date_key < until)
+            ):
+                result.append((evt.date_key, pos, evt))
+
+        result.sort(reverse=True)
+        return [evt for _, _, evt in result[:limit]]
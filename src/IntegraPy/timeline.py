@@ -0,0 +1,270 @@
+# -*- coding: UTF-8 -*-
+'''
+Run-length encoded on/off history of panel objects
+
+A Timeline keeps only the times an object was switched on and off, with
+a running total of time on, so the time on within any interval is found
+with two binary searches. ActivityTimeline keeps a Timeline per object:
+(group, number), where groups are 'zones', 'partitions' and 'outputs'
+for state polls, and 'event <code>' for events which have a restore
+counterpart (e.g. zone violation / zone restore).
+
+File format (little endian): header: magic 'IPYT', version (H),
+number of timelines (I); per timeline: group length (H), group (UTF-8),
+number (H), number of transitions (I), transitions (d each) and running
+totals (d each).
+'''
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from struct import Struct
+import sys
+import time
+
+from .constants import EVENT_DESCRIPTIONS
+
+MAGIC = b'IPYT'
+VERSION = 1
+FILE_HEADER = Struct('<4sHI')
+GROUP_LENGTH = Struct('<H')
+TIMELINE_HEADER = Struct('<HI')
+BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def seconds(value):
+    '''
+    Unix time of a datetime (local time, like panel time) or a number
+    '''
+    if isinstance(value, datetime):
+        return time.mktime(value.timetuple()) + value.microsecond / 1e6
+    return float(value)
+
+
+class Timeline(object):
+    '''
+    On/off history of a single object; `transitions` alternate between
+    switching on and off, starting with on
+    '''
+
+    def __init__(self):
+        self.transitions = array('d')
+        # time on until each transition
+        self.totals = array('d')
+
+    def __len__(self):
+        return len(self.transitions)
+
+    @property
+    def on(self):
+        return len(self.transitions) % 2 == 1
+
+    def _append_total(self, timestamp):
+        index = len(self.totals)
+        total = self.totals[-1] if index else 0.0
+        if index % 2:
+            # switched off - add the time since switching on
+            total += timestamp - self.transitions[index - 1]
+        self.totals.append(total)
+
+    def set(self, on, timestamp):
+        '''
+        Records the state at `timestamp`; a timestamp older than the
+        last transition is taken as the time of the last transition
+        '''
+        timestamp = seconds(timestamp)
+        if bool(on) == self.on:
+            return
+        if self.transitions:
+            timestamp = max(timestamp, self.transitions[-1])
+        self.transitions.append(timestamp)
+        self._append_total(timestamp)
+
+    def state_at(self, timestamp):
+        return bisect_right(self.transitions, seconds(timestamp)) % 2 == 1
+
+    def time_on_until(self, timestamp):
+        '''
+        Total time on before `timestamp`
+        '''
+        timestamp = seconds(timestamp)
+        index = bisect_right(self.transitions, timestamp)
+        if not index:
+            return 0.0
+        total = self.totals[index - 1]
+        if index % 2:
+            total += timestamp - self.transitions[index - 1]
+        return total
+
+    def duration(self, start, end):
+        '''
+        Time on within [start, end), seconds
+        '''
+        return self.time_on_until(end) - self.time_on_until(start)
+
+    def duty_cycle(self, start, end):
+        length = seconds(end) - seconds(start)
+        return self.duration(start, end) / length if length > 0 else 0.0
+
+    def count(self, start, end):
+        '''
+        Number of times switched on within [start, end)
+        '''
+        transitions = self.transitions
+        first = bisect_left(transitions, seconds(start))
+        last = bisect_left(transitions, seconds(end))
+        # switching on has an even index
+        return (last + 1) // 2 - (first + 1) // 2
+
+    def intervals(self, start, end):
+        '''
+        Yields (on, off) periods within [start, end), clipped to it
+        '''
+        start, end = seconds(start), seconds(end)
+        transitions = self.transitions
+        index = bisect_right(transitions, start)
+        if index % 2:
+            index -= 1
+
+        while index < len(transitions) and transitions[index] < end:
+            on = max(transitions[index], start)
+            off = transitions[index + 1] if index + 1 < len(transitions) \
+                else end
+            if off > start:
+                yield on, min(off, end)
+            index += 2
+
+
+class ActivityTimeline(object):
+    '''
+    Timelines of many objects, fed with state polls and events
+    '''
+
+    def __init__(self):
+        self.timelines = {}
+        # group -> numbers of objects on
+        self._on = {}
+
+    def timeline(self, group, number):
+        try:
+            return self.timelines[(group, number)]
+        except KeyError:
+            timeline = self.timelines[(group, number)] = Timeline()
+            return timeline
+
+    def observe(self, group, positions, timestamp=None):
+        '''
+        Records a poll result, e.g. observe('zones', violated_zones)
+        '''
+        timestamp = time.time() if timestamp is None else seconds(timestamp)
+        positions = set(positions)
+        on = self._on.setdefault(group, set())
+
+        for number in positions - on:
+            self.timeline(group, number).set(True, timestamp)
+        for number in on - positions:
+            self.timeline(group, number).set(False, timestamp)
+        self._on[group] = positions
+
+    def add_change(self, change):
+        '''
+        Records a StateChange; use as a PollScheduler subscriber
+        '''
+        self.observe(change.group, change.current, change.timestamp)
+
+    def add_event(self, evt):
+        '''
+        Records an event which starts or ends a state; returns False for
+        other events. Events must come oldest first, see extend.
+        '''
+        starts = EVENT_DESCRIPTIONS.get((evt.code, 0))
+        ends = EVENT_DESCRIPTIONS.get((evt.code, 1))
+        # some codes are described the same way with and without restore
+        if starts is None or ends is None or starts[1] == ends[1]:
+            return False
+
+        group = 'event {}'.format(evt.code)
+        self.timeline(group, evt.source_number).set(
+            not evt.restore, seconds(evt.timestamp)
+        )
+        return True
+
+    def extend(self, events):
+        '''
+        Records events given in any order, e.g. newest first as read from
+        the panel; events of the same minute are ordered by their index
+        '''
+        for evt in sorted(
+            events, key=lambda evt: (evt.date_key, int(evt.event_index, 16))
+        ):
+            self.add_event(evt)
+
+    def select(self, group):
+        return dict(
+            (number, timeline)
+            for (timeline_group, number), timeline in self.timelines.items()
+            if timeline_group == group
+        )
+
+    def durations(self, group, start, end):
+        '''
+        Returns a dict: number -> time on within [start, end) of objects
+        of the group which were on in it
+        '''
+        result = {}
+        for number, timeline in self.select(group).items():
+            duration = timeline.duration(start, end)
+            if duration:
+                result[number] = duration
+        return result
+
+    def duty_cycles(self, group, start, end):
+        length = seconds(end) - seconds(start)
+        return dict(
+            (number, duration / length)
+            for number, duration in self.durations(group, start, end).items()
+        )
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(FILE_HEADER.pack(MAGIC, VERSION, len(self.timelines)))
+            for (group, number), timeline in sorted(self.timelines.items()):
+                name = group.encode('utf-8')
+                f.write(GROUP_LENGTH.pack(len(name)))
+                f.write(name)
+                f.write(TIMELINE_HEADER.pack(number, len(timeline)))
+                for values in (timeline.transitions, timeline.totals):
+                    if BIG_ENDIAN:
+                        values = array('d', values)
+                        values.byteswap()
+                    f.write(values.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        activity = cls()
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        magic, version, count = FILE_HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a timeline file'.format(path))
+
+        offset = FILE_HEADER.size
+        for n in range(count):
+            length, = GROUP_LENGTH.unpack_from(data, offset)
+            offset += GROUP_LENGTH.size
+            group = data[offset:offset + length].decode('utf-8')
+            offset += length
+            number, size = TIMELINE_HEADER.unpack_from(data, offset)
+            offset += TIMELINE_HEADER.size
+
+            timeline = Timeline()
+            for values in (timeline.transitions, timeline.totals):
+                values.frombytes(data[offset:offset + size * 8])
+                if BIG_ENDIAN:
+                    values.byteswap()
+                offset += size * 8
+            activity.timelines[(group, number)] = timeline
+            if timeline.on:
+                activity._on.setdefault(group, set()).add(number)
+
+        return activity
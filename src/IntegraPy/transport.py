@@ -0,0 +1,439 @@
+# -*- coding: UTF-8 -*-
+'''
+Transports moving integration protocol frames over TCP
+
+All of them use IntegraProtocol for framing and validation and differ
+only in how they wait for I/O: BlockingTransport in the calling thread,
+ThreadedTransport in a background thread owning a persistent connection,
+AsyncioTransport in an asyncio event loop.
+
+Every command is bounded: connecting by `connect_timeout`, waiting for
+each response by `read_timeout` and the whole command, including
+repetitions after "Busy!", by `timeout` (or a Deadline given per call).
+'''
+import time
+import socket
+import asyncio
+import logging
+from binascii import hexlify
+from threading import Thread, RLock, Event
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from concurrent.futures import Future
+
+from .commands import COMMANDS
+from .exceptions import (
+    IntegraConnectionError, IntegraTimeout, IntegraCancelled
+)
+from .framing import prepare_frame
+from .protocol import IntegraProtocol, Busy, event_data
+from .replay import REQUEST, RESPONSE
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def log_frame(msg, frame):
+    log.debug(
+        msg + '"%s", length: %d',
+        hexlify(frame),
+        len(frame)
+    )
+
+
+class Deadline(object):
+    '''
+    Time limit of a command, which can also be cancelled from another
+    thread; cancelling shuts down the socket the command waits on
+    '''
+
+    def __init__(self, timeout=None):
+        self.expires = None if timeout is None else time.monotonic() + timeout
+        self._cancelled = Event()
+        self._sock = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def attach(self, sock):
+        self._sock = sock
+
+    def check(self):
+        '''
+        Raises if the command was cancelled or the deadline passed
+        '''
+        if self.cancelled:
+            raise IntegraCancelled('Command cancelled')
+        if self.expires is not None and time.monotonic() >= self.expires:
+            raise IntegraTimeout('Command deadline exceeded')
+
+    def timeout(self, limit):
+        '''
+        Returns `limit` shortened to the time left
+        '''
+        self.check()
+        if self.expires is None:
+            return limit
+        left = max(self.expires - time.monotonic(), 0.001)
+        return left if limit is None else min(limit, left)
+
+    def sleep(self, seconds):
+        # wakes up early when cancelled
+        self._cancelled.wait(self.timeout(seconds))
+        self.check()
+
+
+class BaseTransport(object):
+    '''
+    Repeats commands refused with "Busy!", `delay` grows with attempts
+    '''
+
+    def __init__(
+        self,
+        host,
+        port=7094,
+        delay=0.002,
+        max_attempts=3,
+        recorder=None,
+        connect_timeout=5.0,
+        read_timeout=5.0,
+        timeout=None
+    ):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.max_attempts = max_attempts
+        # Optional FrameRecorder capturing raw frames
+        self.recorder = recorder
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # Default deadline of a command, seconds
+        self.timeout = timeout
+
+    def _record(self, direction, frame):
+        if self.recorder:
+            self.recorder.record(direction, frame)
+
+    def exchange(self, frame, deadline=None):
+        '''
+        Sends a prepared frame; returns a protocol event - Response,
+        Error or Busy (when all attempts were refused)
+        '''
+        if deadline is None:
+            deadline = Deadline(self.timeout)
+
+        for attempt in range(self.max_attempts):
+            event = self._roundtrip(frame, deadline)
+            if not isinstance(event, Busy):
+                break
+            if attempt + 1 < self.max_attempts:
+                deadline.sleep(self.delay * (attempt + 1))
+
+        return event
+
+    def run_command(self, cmd, deadline=None):
+        '''
+        Runs a command given in hex; returns response data
+        '''
+        command = prepare_frame(cmd)
+        log_frame('Sending command: ', command)
+        return event_data(self.exchange(command, deadline))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BlockingTransport(BaseTransport):
+    '''
+    Exchanges frames in the calling thread. Opens a connection per
+    command unless `persistent` is set; a persistent connection is
+    shared by threads one command at a time.
+    '''
+
+    def __init__(self, host, port=7094, persistent=False, **kwargs):
+        super(BlockingTransport, self).__init__(host, port, **kwargs)
+        self.persistent = persistent
+        self._lock = RLock()
+        self._sock = None
+        self._protocol = None
+
+    def _open(self, deadline):
+        timeout = deadline.timeout(self.connect_timeout)
+        sock = None
+        try:
+            try:
+                family, type, proto, _, address = socket.getaddrinfo(
+                    self.host, self.port, 0, socket.SOCK_STREAM
+                )[0]
+                sock = socket.socket(family, type, proto)
+                # shutting the socket down on cancel aborts connecting too
+                deadline.attach(sock)
+                deadline.check()
+                sock.settimeout(timeout)
+                sock.connect(address)
+            except socket.timeout:
+                deadline.check()
+                raise IntegraTimeout(
+                    'Connecting to {}:{} timed out'.format(
+                        self.host, self.port
+                    )
+                )
+            except (OSError, socket.error) as exc:
+                deadline.check()
+                raise IntegraConnectionError(
+                    'Connecting to {}:{} failed: {}'.format(
+                        self.host, self.port, exc
+                    )
+                )
+        except BaseException:
+            if sock is not None:
+                sock.close()
+            raise
+        finally:
+            deadline.attach(None)
+        return sock
+
+    def _new_protocol(self):
+        return IntegraProtocol()
+
+    def _transfer(self, sock, protocol, frame, deadline):
+        deadline.attach(sock)
+        try:
+            self._record(REQUEST, frame)
+            sock.settimeout(deadline.timeout(self.read_timeout))
+            sock.sendall(protocol.send_frame(frame))
+
+            event = protocol.next_event()
+            while event is None:
+                sock.settimeout(deadline.timeout(self.read_timeout))
+                data = sock.recv(1024)
+                if not data:
+                    deadline.check()
+                    raise IntegraConnectionError(
+                        'Connection closed by Integra'
+                    )
+                protocol.receive_data(data)
+                event = protocol.next_event()
+        except socket.timeout:
+            deadline.check()
+            raise IntegraTimeout('No response from Integra')
+        except (OSError, socket.error) as exc:
+            deadline.check()
+            raise IntegraConnectionError(str(exc))
+        finally:
+            deadline.attach(None)
+
+        log_frame('Response received: ', event.frame)
+        self._record(RESPONSE, event.frame)
+        return event
+
+    def _roundtrip(self, frame, deadline):
+        if not self.persistent:
+            sock = self._open(deadline)
+            try:
+                return self._transfer(
+                    sock, self._new_protocol(), frame, deadline
+                )
+            finally:
+                sock.close()
+
+        with self._lock:
+            if self._sock is None:
+                self._sock = self._open(deadline)
+                self._protocol = self._new_protocol()
+            try:
+                return self._transfer(
+                    self._sock, self._protocol, frame, deadline
+                )
+            except Exception:
+                # the connection state is unknown now
+                self.close()
+                raise
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+
+class ThreadedTransport(BaseTransport):
+    '''
+    A background thread owns a persistent connection and exchanges
+    frames queued by any number of threads; submit returns a Future.
+    Cancelling the Future drops a queued command; a running one is
+    interrupted through its Deadline.
+    '''
+
+    def __init__(self, host, port=7094, **kwargs):
+        super(ThreadedTransport, self).__init__(host, port, **kwargs)
+        self._blocking = BlockingTransport(
+            host, port, persistent=True, **kwargs
+        )
+        self._queue = Queue()
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            frame, deadline, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._blocking.exchange(frame, deadline))
+            except Exception as exc:
+                future.set_exception(exc)
+
+        self._blocking.close()
+
+    def submit(self, frame, deadline=None):
+        '''
+        Queues a frame; returns a Future of the protocol event
+        '''
+        if deadline is None:
+            # the deadline counts from submission, including queueing
+            deadline = Deadline(self.timeout)
+
+        future = Future()
+        self._queue.put((frame, deadline, future))
+        return future
+
+    def exchange(self, frame, deadline=None):
+        return self.submit(frame, deadline).result()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+class AsyncioTransport(BaseTransport):
+    '''
+    Exchanges frames over a persistent connection in an asyncio loop;
+    exchange is a coroutine, cancelled the usual asyncio way
+    '''
+
+    def __init__(self, host, port=7094, **kwargs):
+        super(AsyncioTransport, self).__init__(host, port, **kwargs)
+        self._reader = self._writer = None
+        self._protocol = None
+        self._lock = None
+
+    async def _connect(self):
+        if self._writer is not None:
+            return
+
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                self.connect_timeout
+            )
+        except asyncio.TimeoutError:
+            raise IntegraTimeout(
+                'Connecting to {}:{} timed out'.format(self.host, self.port)
+            )
+        except OSError as exc:
+            raise IntegraConnectionError(
+                'Connecting to {}:{} failed: {}'.format(
+                    self.host, self.port, exc
+                )
+            )
+        self._protocol = IntegraProtocol()
+
+    async def _roundtrip(self, frame):
+        protocol = self._protocol
+        try:
+            self._record(REQUEST, frame)
+            self._writer.write(protocol.send_frame(frame))
+
+            event = protocol.next_event()
+            while event is None:
+                data = await asyncio.wait_for(
+                    self._reader.read(1024), self.read_timeout
+                )
+                if not data:
+                    raise IntegraConnectionError(
+                        'Connection closed by Integra'
+                    )
+                protocol.receive_data(data)
+                event = protocol.next_event()
+        except asyncio.TimeoutError:
+            self.close()
+            raise IntegraTimeout('No response from Integra')
+        except BaseException:
+            # also on cancellation - the connection state is unknown now
+            self.close()
+            raise
+
+        self._record(RESPONSE, event.frame)
+        return event
+
+    async def _exchange(self, frame):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # one command at a time on the connection
+        async with self._lock:
+            for attempt in range(self.max_attempts):
+                await self._connect()
+                event = await self._roundtrip(frame)
+                if not isinstance(event, Busy):
+                    break
+                await asyncio.sleep(self.delay * (attempt + 1))
+
+        return event
+
+    async def exchange(self, frame, timeout=None):
+        '''
+        Sends a prepared frame; `timeout` overrides the transport's
+        command deadline
+        '''
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._exchange(frame), timeout)
+        except asyncio.TimeoutError:
+            raise IntegraTimeout('Command deadline exceeded')
+
+    async def run_command(self, cmd, timeout=None):
+        command = prepare_frame(cmd)
+        log_frame('Sending command: ', command)
+        return event_data(await self.exchange(command, timeout))
+
+    async def execute(self, name, *args, timeout=None):
+        '''
+        Runs a command from the registry; see Integra.execute
+        '''
+        command = COMMANDS[name]
+        return command.parse(
+            await self.run_command(command.encode(*args), timeout)
+        )
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = self._reader = None
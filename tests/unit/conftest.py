@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+from threading import Thread
+
+import pytest
+
+# user access (422/1) on the 24th, partition 11
+RAW_EVENT = b'\x7f\x98\x83\x13]\xa6\n\x02\x06h\xde\xff\xff\xff'
+
+
+@pytest.fixture
+def serve():
+    '''
+    Runs socket servers in background threads; shuts them down after
+    the test, the last started first
+    '''
+    servers = []
+
+    def start(server):
+        Thread(target=server.serve_forever).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in reversed(servers):
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def simulated_panel(serve):
+    '''
+    Starts SimulatedPanels, e.g. simulated_panel(busy_rate=0.2)
+    '''
+    from IntegraPy.simulator import SimulatedPanel
+
+    def start(**kwargs):
+        return serve(SimulatedPanel(**kwargs))
+
+    return start
+
+
+@pytest.fixture
+def panel(simulated_panel):
+    return simulated_panel()
+
+
+@pytest.fixture
+def make_event():
+    '''
+    Builds events of 2017 from RAW_EVENT, e.g. make_event(5, day=3);
+    other keyword arguments set event attributes
+    '''
+    from IntegraPy import parse_event
+
+    def make(index=None, code=None, **attributes):
+        evt = parse_event(RAW_EVENT)
+        evt.current_year = 2017
+        if index is not None:
+            evt._event_index[:] = [0, 0, index]
+        if code is not None:
+            evt.code_high, evt.code_low = divmod(code, 0x100)
+        for name, value in attributes.items():
+            setattr(evt, name, value)
+        return evt
+
+    return make
@@ -0,0 +1,72 @@
+# -*- coding: UTF-8 -*-
+from datetime import date, datetime
+
+
+class FakeIntegra(object):
+    host = '127.0.0.1'
+    port = 7094
+
+    def __init__(self, events):
+        # newest first, as the panel returns them
+        self.events = events
+
+    def iter_events(self, start=b'FFFFFF', stop=None, limit=None):
+        for evt in self.events[:limit]:
+            if evt.event_index == stop:
+                break
+            yield evt
+
+
+def test_archive_roundtrip(tmpdir, make_event):
+    from IntegraPy.archive import ArchiveWriter, EventArchive
+
+    path = str(tmpdir.join('events.ipye'))
+    with ArchiveWriter(path) as writer:
+        writer.extend(make_event(idx, day=idx) for idx in range(1, 11))
+
+    with EventArchive(path) as archive:
+        assert len(archive) == 10
+        assert archive.last_index == b'00000A'
+        assert archive[0].year == 2017
+        assert archive[0].time == '13:07'
+        assert archive.find(b'000005').day == 5
+        assert archive.find(b'0000FF') is None
+
+        found = list(archive.query(
+            since=date(2017, 8, 3), until=datetime(2017, 8, 6)
+        ))
+        assert [evt.day for evt in found] == [3, 4, 5]
+        assert list(archive.query(code=1)) == []
+
+
+def test_export_events_incremental(tmpdir, make_event):
+    from IntegraPy.archive import export_fleet, EventArchive
+
+    integra = FakeIntegra([make_event(idx) for idx in (3, 2, 1)])
+    assert export_fleet([integra], str(tmpdir)) == {('127.0.0.1', 7094): 3}
+
+    integra.events = [make_event(idx) for idx in (5, 4, 3, 2, 1)]
+    assert export_fleet([integra], str(tmpdir)) == {('127.0.0.1', 7094): 2}
+
+    with EventArchive(str(tmpdir.join('127.0.0.1_7094.ipye'))) as archive:
+        assert [evt.event_index for evt in archive] == [
+            b'000001', b'000002', b'000003', b'000004', b'000005'
+        ]
+
+
+def test_export_events_gap(tmpdir, caplog, make_event):
+    from IntegraPy.archive import export_events
+
+    path = str(tmpdir.join('events.ipye'))
+    integra = FakeIntegra([make_event(idx) for idx in (3, 2, 1)])
+    # limit caps only the first export
+    assert export_events(integra, path, limit=2) == 2
+
+    integra.events = [make_event(idx) for idx in (9, 8, 7, 6, 5, 4, 3)]
+    assert export_events(integra, path, limit=2) == 6
+    assert 'lost' not in caplog.text
+
+    # events 10-12 were overwritten before this export
+    integra.events = [make_event(idx) for idx in (15, 14, 13)]
+    assert export_events(integra, path) == 3
+    assert 'Event 000009 not found' in caplog.text
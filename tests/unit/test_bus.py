@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+from threading import Thread, Event
+
+from IntegraPy import Integra
+
+
+def test_follower_fan_out(panel):
+    from IntegraPy.bus import EventFollower, DROP_NEWEST
+
+    try:
+        follower = EventFollower(Integra(1234, *panel.server_address))
+        bus = follower.bus
+
+        everything = bus.subscribe()
+        small = bus.subscribe(maxsize=2, policy=DROP_NEWEST)
+        batches = []
+        delivered = Event()
+
+        def callback(events):
+            batches.append(events)
+            delivered.set()
+
+        bus.subscribe_callback(callback, batch=10)
+
+        assert follower.poll() == 0
+        panel.state.events += 3
+        assert follower.poll() == 3
+        assert follower.poll() == 0
+
+        indexes = [evt.event_index for evt in everything.get_batch()]
+        assert indexes == [b'000101', b'000102', b'000103']
+        assert len(small) == 2 and small.dropped == 1
+
+        delivered.wait(1)
+        assert sum(len(batch) for batch in batches) == 3
+        assert everything.get(0) is None
+    finally:
+        bus.close()
+
+
+def test_policies_and_async_iteration():
+    from IntegraPy.bus import EventBus, DROP_OLDEST, BLOCK
+
+    bus = EventBus()
+    oldest = bus.subscribe(maxsize=3, policy=DROP_OLDEST)
+    blocking = bus.subscribe(maxsize=3, policy=BLOCK)
+
+    def publish():
+        for n in range(10):
+            bus.publish(n)
+        bus.close()
+
+    publisher = Thread(target=publish)
+    publisher.start()
+
+    async def consume():
+        return [evt async for evt in blocking]
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(consume()) == list(range(10))
+    finally:
+        loop.close()
+    publisher.join()
+    assert oldest.get_batch() == [7, 8, 9]
+    assert oldest.dropped == 7
+
+
+def test_follower_thread(panel):
+    from IntegraPy.bus import EventFollower
+
+    follower = EventFollower(Integra(1234, *panel.server_address), interval=0)
+    subscription = follower.bus.subscribe()
+    # remembers the newest event
+    follower.poll()
+    follower.start()
+    try:
+        panel.state.events += 2
+        events = subscription.get_batch(timeout=2)
+        if len(events) < 2:
+            events += subscription.get_batch(timeout=2)
+    finally:
+        follower.stop()
+    assert [evt.event_index for evt in events] == [b'000101', b'000102']
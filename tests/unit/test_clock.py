@@ -0,0 +1,54 @@
+# -*- coding: UTF-8 -*-
+from datetime import datetime
+
+
+class FakeIntegra(object):
+    def __init__(self, now):
+        self.now = now
+        self.calls = 0
+
+    def get_time(self):
+        self.calls += 1
+        return self.now
+
+
+def test_panel_clock_is_read_once():
+    from IntegraPy.clock import PanelClock
+
+    integra = FakeIntegra(datetime(2020, 12, 31, 23, 59, 59))
+    clock = PanelClock(integra)
+
+    assert clock.get_time() >= integra.now
+    assert clock.current_year in (2020, 2021)
+    for _ in range(100):
+        clock.get_time()
+    assert integra.calls == 1
+
+    clock.invalidate()
+    clock.get_time()
+    assert integra.calls == 2
+
+
+def test_panel_clock_drift_shortens_interval():
+    from datetime import timedelta
+    from IntegraPy.clock import PanelClock
+
+    integra = FakeIntegra(datetime(2020, 1, 1))
+    clock = PanelClock(integra, refresh_interval=600, min_interval=60)
+    clock.sync()
+
+    integra.now += timedelta(minutes=5)
+    clock.sync()
+    assert clock.drift > 200
+    assert clock._interval == 300
+
+
+def test_event_year_across_cycle():
+    from IntegraPy import parse_event
+
+    evt = parse_event(b'\x7f\x98\x83\x13]\xa6\n\x02\x06h\xde\xff\xff\xff')
+    evt._year = 3
+    evt.current_year = 2020
+    assert evt.year == 2019
+    evt._year = 0
+    assert evt.year == 2020
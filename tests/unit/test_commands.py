@@ -0,0 +1,43 @@
+# -*- coding: UTF-8 -*-
+from binascii import unhexlify
+from datetime import datetime
+
+
+def test_encode():
+    from IntegraPy.commands import COMMANDS
+
+    assert COMMANDS['version'].encode() == b'7E'
+    assert COMMANDS['name'].encode(1, 12) == b'EE010C'
+    assert COMMANDS['event'].encode(b'\xff\xff\xff') == b'8CFFFFFF'
+    assert COMMANDS['outputs_on'].encode(b'\x12' * 8, b'\x00' * 16) == \
+        b'88' + b'12' * 8 + b'00' * 16
+
+
+def test_decode_time():
+    from IntegraPy.commands import COMMANDS
+
+    assert COMMANDS['time'].parse(unhexlify('20171231235958A1')) == \
+        datetime(2017, 12, 31, 23, 59, 58)
+
+
+def test_decode_version():
+    from IntegraPy.commands import COMMANDS
+
+    res = COMMANDS['version'].parse(
+        bytearray([3]) + b'12020170830' + bytearray([1, 255])
+    )
+    assert res == dict(
+        model='INTEGRA 128',
+        version='1.20 2017-08-30',
+        language='English',
+        settings_stored=True
+    )
+
+
+def test_decode_temperature_and_bitmaps():
+    from IntegraPy.commands import COMMANDS
+
+    assert COMMANDS['zone_temperature'].parse(b'\x05\x00\x96') == 20.0
+    assert COMMANDS['zone_temperature'].parse(b'\x05\xff\xff') is None
+    assert COMMANDS['bypassed_zones'].parse(b'\x05' + b'\x00' * 15) == \
+        set([1, 3])
@@ -0,0 +1,75 @@
+# -*- coding: UTF-8 -*-
+from binascii import unhexlify
+
+from IntegraPy import Integra, set_bits_positions, bytes_with_bits_set
+
+
+class FakePanel(Integra):
+    '''
+    Keeps output and partition state locally; output 13 is stuck,
+    partitions stay in exit delay
+    '''
+    def __init__(self):
+        super(FakePanel, self).__init__(1234, '127.0.0.1')
+        self.outputs = set([1, 13])
+        self.armed = set()
+        self.exit_delay = set()
+        self.commands = []
+
+    def run_command(self, cmd, deadline=None):
+        self.commands.append(cmd[:2])
+        payload = set_bits_positions(unhexlify(cmd[2:])[8:])
+
+        if cmd[:2] == b'17':
+            return bytes_with_bits_set(self.outputs, 128)
+        elif cmd[:2] == b'09':
+            return bytes_with_bits_set(self.armed | self.exit_delay, 32)
+        elif cmd[:2] == b'0A':
+            return bytes_with_bits_set(self.armed, 32)
+        elif cmd[:2] == b'80':
+            self.exit_delay |= payload
+        elif cmd[:2] == b'84':
+            self.armed -= payload
+            self.exit_delay -= payload
+        elif cmd[:2] == b'88':
+            self.outputs |= payload
+        elif cmd[:2] == b'89':
+            self.outputs -= payload
+        elif cmd[:2] == b'91':
+            self.outputs ^= payload - set([13])
+        return b'\xff'
+
+
+def test_outputs_confirmed():
+    integra = FakePanel()
+    assert integra.outputs_on([2, 3]) == {2: True, 3: True}
+    assert integra.commands == [b'88', b'17']
+
+    # fire and forget by default
+    assert integra.toggle_outputs([1, 2]) is None
+    assert integra.commands[-1] == b'91'
+    assert integra.outputs == set([3, 13])
+
+
+def test_toggle_timeout():
+    integra = FakePanel()
+    outcome = integra.toggle_outputs([1, 13], timeout=0.05, interval=0.01)
+    assert outcome == {1: True, 13: False}
+
+
+def test_arm_disarm():
+    integra = FakePanel()
+    # confirmed during exit delay, before 0A reports the partitions
+    assert integra.arm([1, 3]) == {1: True, 3: True}
+    assert integra.get_armed_partitions() == set()
+    assert integra.disarm([3]) == {3: True}
+    assert integra.exit_delay == set([1])
+
+
+def test_wrong_arming_mode():
+    import pytest
+
+    integra = FakePanel()
+    with pytest.raises(ValueError):
+        integra.arm([1], mode=4)
+    assert integra.commands == []
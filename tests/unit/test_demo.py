@@ -0,0 +1,80 @@
+# -*- coding: UTF-8 -*-
+import io
+
+
+def test_screen_redraws_changed_lines():
+    from IntegraPy.demo import Screen
+
+    out = io.StringIO()
+    screen = Screen(out)
+    screen.draw(['a', 'b', 'c'])
+    out.seek(0)
+    out.truncate()
+
+    screen.draw(['a', 'x'])
+    assert out.getvalue() == '\x1b[2;1Hx\x1b[K\x1b[3;1H\x1b[K\x1b[3;1H'
+
+
+class CommandCounter(object):
+    '''
+    Counts requests per command code; used as a recorder
+    '''
+
+    def __init__(self):
+        self.codes = {}
+
+    def record(self, direction, frame):
+        if direction == 0:
+            code = bytearray(frame)[2]
+            self.codes[code] = self.codes.get(code, 0) + 1
+
+
+def test_watch_follows_new_events(panel):
+    from IntegraPy import Integra, BlockingTransport
+    from IntegraPy.demo import Demo, Screen
+
+    counter = CommandCounter()
+    transport = BlockingTransport(
+        *panel.server_address, persistent=True, recorder=counter
+    )
+    try:
+        demo = Demo(Integra(1234, *panel.server_address, transport=transport))
+        screen = Screen(io.StringIO())
+        screen.draw(demo.refresh())
+        # one 8C per event shown, names only of violated zone 1
+        assert counter.codes[0x8C] == 10
+        assert counter.codes[0xEE] == 1
+
+        demo.watch(screen, interval=0, iterations=1)
+        assert screen.lines[4] == 'Violated zones:   Object 1-1'
+        assert len(demo.events) == 10
+
+        newest = demo.events[0].event_index
+        panel.state.events += 1
+        sent = sum(counter.codes.values())
+        screen.draw(demo.refresh())
+        assert demo.events[0].event_index == b'%06X' % (int(newest, 16) + 1)
+        # 3 state reads and 2 event reads
+        assert sum(counter.codes.values()) - sent == 5
+    finally:
+        transport.close()
+
+
+def test_watch_survives_errors(panel):
+    from IntegraPy import Integra
+    from IntegraPy.demo import Demo, Screen
+
+    demo = Demo(Integra(1234, *panel.server_address))
+    screen = Screen(io.StringIO())
+    demo.watch(screen, interval=0, iterations=1)
+    lines = screen.lines
+
+    # every command refused with "Busy!"
+    panel.busy_rate = 1.0
+    demo.watch(screen, interval=0, iterations=2)
+    assert screen.lines[:-1] == lines
+    assert screen.lines[-1].startswith('Refresh failed: ')
+
+    panel.busy_rate = 0.0
+    demo.watch(screen, interval=0, iterations=1)
+    assert len(screen.lines) == len(lines)
@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+import pytest
+
+pytest.importorskip('cryptography')
+
+
+def test_cipher_roundtrip():
+    from IntegraPy.encryption import SatelCipher, encryption_key
+
+    assert encryption_key('1234') == b'1234        1234        '
+
+    cipher = SatelCipher('1234')
+    for length in (6, 15, 16, 17, 40):
+        data = bytes(bytearray(range(length)))
+        encrypted = cipher.encrypt(data)
+        assert len(encrypted) == max(length, 16)
+        assert encrypted[:length] != data
+        assert cipher.decrypt(encrypted)[:length] == data
+
+    # same data, different random bytes - different message
+    assert cipher.seal(0, 1, 2, b'data') != cipher.seal(0, 1, 2, b'data')
+    counter, id_s, id_r, data = cipher.open(
+        cipher.seal(7, 1, 2, b'\xfe\xfe\x00\xd7\xe2\xfe\x0d')[1:]
+    )
+    assert (counter, id_s, id_r, data) == \
+        (7, 1, 2, b'\xfe\xfe\x00\xd7\xe2\xfe\x0d')
+
+
+def test_encrypted_transport(simulated_panel):
+    from IntegraPy import Integra
+
+    panel = simulated_panel(integration_key='secret')
+    integra = Integra(1234, *panel.server_address, integration_key='secret')
+    assert integra.get_violated_zones() == set([1])
+    assert integra.get_version()['model'] == 'INTEGRA 128'
+    assert integra.arm([2], timeout=None) is None
+    assert integra.get_armed_partitions() == set([2])
+
+
+def test_response_to_another_message():
+    from IntegraPy import ProtocolError, prepare_frame
+    from IntegraPy.encryption import SatelCipher, EncryptedProtocol
+
+    cipher = SatelCipher('secret')
+    protocol = EncryptedProtocol(cipher)
+    protocol.send_frame(prepare_frame('00'))
+
+    with pytest.raises(ProtocolError):
+        protocol.receive_data(cipher.seal(
+            0, 5, (protocol.id_s + 1) & 0xFF, prepare_frame('00' + '00' * 16)
+        ))
+
+    protocol.send_frame(prepare_frame('00'))
+    protocol.receive_data(cipher.seal(
+        0, 5, protocol.id_s, prepare_frame('00' + '00' * 16)
+    ))
+    assert protocol.next_event().data == bytes(16)
+    assert protocol.id_r == 5
@@ -0,0 +1,107 @@
+# -*- coding: UTF-8 -*-
+from threading import Thread
+
+from IntegraPy import Integra
+
+
+def test_gateway_cache_and_coalescing(serve, simulated_panel):
+    from IntegraPy.gateway import Gateway, GatewayServer
+
+    panel = simulated_panel(latency=0.05)
+    upstream = Integra(1234, *panel.server_address)
+    server = serve(GatewayServer(Gateway(upstream), ('127.0.0.1', 0)))
+
+    client = Integra(1234, *server.server_address)
+    threads = [
+        Thread(target=client.get_violated_zones) for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.get_violated_zones() == set([1])
+    stats = server.gateway.stats
+    assert stats['upstream'] == 1
+    assert stats['coalesced'] + stats['cached'] == 5
+
+    # state changing commands are not cached and invalidate the cache
+    client.outputs_on([2], timeout=None)
+    client.outputs_on([2], timeout=None)
+    assert client.get_active_outputs() == set([2])
+    assert stats['upstream'] == 4
+
+
+def test_reads_keep_cache(serve, simulated_panel):
+    from IntegraPy.gateway import Gateway, GatewayServer
+
+    panel = simulated_panel()
+    upstream = Integra(1234, *panel.server_address)
+    server = serve(GatewayServer(Gateway(upstream), ('127.0.0.1', 0)))
+
+    client = Integra(1234, *server.server_address)
+    client.get_violated_zones()
+    client.get_name(1, 1)
+    # reads the time (1A) and an event (8C), never cached
+    client.get_event()
+    client.get_event()
+    client.get_violated_zones()
+    # a fresh client has no names cached locally
+    Integra(1234, *server.server_address).get_name(1, 1)
+
+    stats = server.gateway.stats
+    assert stats['cached'] == 2
+    assert stats['upstream'] == 5
+
+
+def test_control_commands_are_not_merged(serve, simulated_panel):
+    from IntegraPy.gateway import Gateway, GatewayServer
+
+    panel = simulated_panel(latency=0.05)
+    upstream = Integra(1234, *panel.server_address)
+    server = serve(GatewayServer(Gateway(upstream), ('127.0.0.1', 0)))
+
+    client = Integra(1234, *server.server_address)
+    before = client.get_active_outputs()
+    threads = [
+        Thread(target=client.toggle_outputs, args=([2],)) for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = server.gateway.stats
+    assert stats['coalesced'] == 0
+    assert stats['upstream'] == 3
+    # toggled twice
+    assert client.get_active_outputs() == before
+
+
+def test_unknown_commands_clear_cache():
+    from IntegraPy import prepare_frame
+    from IntegraPy.gateway import Gateway
+
+    class Response(object):
+        def __init__(self, frame):
+            self.frame = frame
+
+    class Transport(object):
+        def exchange(self, command):
+            return Response(command)
+
+    class Upstream(object):
+        transport = Transport()
+
+    gateway = Gateway(Upstream())
+    zones = prepare_frame('00')
+    gateway.handle_frame(zones)
+    # the time and the event log are read without touching the cache
+    gateway.handle_frame(prepare_frame('1A'))
+    gateway.handle_frame(zones)
+    assert gateway.stats['cached'] == 1
+
+    gateway.handle_frame(prepare_frame('C0'))
+    gateway.handle_frame(zones)
+    assert gateway.stats['cached'] == 1
+    assert gateway.stats['upstream'] == 4
@@ -0,0 +1,67 @@
+# -*- coding: UTF-8 -*-
+import socket
+
+import pytest
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_circuit_opens_and_recovers():
+    from IntegraPy import (
+        Integra, HealthRegistry, IntegraConnectionError, CircuitOpen
+    )
+    from IntegraPy.health import OPEN, HALF_OPEN, CLOSED
+
+    transitions = []
+    health = HealthRegistry(failure_threshold=2, base_backoff=0.0)
+    health.subscribe(lambda h, old, new: transitions.append((old, new)))
+
+    port = closed_port()
+    integra = Integra(1234, '127.0.0.1', port, health=health)
+    for attempt in range(2):
+        with pytest.raises(IntegraConnectionError):
+            integra.get_violated_zones()
+    assert health.get('127.0.0.1', port).state == OPEN
+
+    # backoff passed: one trial command gets through and fails again
+    with pytest.raises(IntegraConnectionError):
+        integra.get_violated_zones()
+    assert transitions == [
+        (CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, OPEN)
+    ]
+
+    health.base_backoff = 60
+    health.record_success('127.0.0.1', port)
+    for attempt in range(2):
+        health.record_failure('127.0.0.1', port)
+    assert not health.available('127.0.0.1', port)
+    with pytest.raises(CircuitOpen):
+        integra.get_violated_zones()
+
+    health.probe = lambda host, port: True
+    health.get('127.0.0.1', port).retry_at = 0
+    health._probe_due()
+    assert health.get('127.0.0.1', port).state == CLOSED
+    assert transitions[-1] == (HALF_OPEN, CLOSED)
+
+
+def test_backoff_doubles():
+    from IntegraPy import HealthRegistry
+
+    health = HealthRegistry(
+        failure_threshold=1, base_backoff=1.0, max_backoff=3.0,
+        probe=lambda host, port: False
+    )
+    health.record_failure('panel', 7094)
+    backoffs = [health.get('panel', 7094).backoff]
+    for attempt in range(3):
+        health.get('panel', 7094).retry_at = 0
+        health._probe_due()
+        backoffs.append(health.get('panel', 7094).backoff)
+    assert backoffs == [1.0, 2.0, 3.0, 3.0]
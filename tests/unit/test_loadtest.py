@@ -0,0 +1,24 @@
+# -*- coding: UTF-8 -*-
+
+
+def test_percentile():
+    from IntegraPy.loadtest import percentile
+
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0.0
+
+
+def test_loadtest_against_simulator(simulated_panel):
+    from IntegraPy.loadtest import LoadTest
+
+    host, port = simulated_panel(busy_rate=0.2).server_address
+    result = LoadTest(
+        host, port, concurrency=2, duration=0.3, delay=0, max_attempts=10
+    ).run()
+
+    assert result['commands'] > 10
+    assert 0 < result['busy_rate'] < 0.5
+    assert result['p50'] <= result['p95'] <= result['p99']
+    assert result['errors'] == 0
@@ -0,0 +1,84 @@
+# -*- coding: UTF-8 -*-
+from datetime import datetime, timedelta
+
+from IntegraPy import Integra
+from IntegraPy.framing import date_key
+
+
+class FakeEvent(object):
+
+    def __init__(self, source, minute):
+        self.source = source
+        self.timestamp = datetime(2020, 1, 1, 12, minute)
+        self.date_key = date_key(self.timestamp)
+
+
+class FakeIntegra(object):
+
+    def __init__(self, source, minutes):
+        self.events = [FakeEvent(source, minute) for minute in minutes]
+        self.read = 0
+
+    def iter_events(self, limit=None):
+        for evt in self.events[:limit]:
+            self.read += 1
+            yield evt
+
+
+def test_merge_logs():
+    from IntegraPy.merge import merge_logs
+
+    panels = [FakeIntegra('a', [50, 30, 10]), FakeIntegra('b', [40, 20])]
+    merged = merge_logs(panels)
+    first = [next(merged) for n in range(2)]
+    # logs are read no further than needed
+    assert [p.read for p in panels] == [2, 1]
+
+    minutes = [evt.timestamp.minute for evt in first + list(merged)]
+    assert minutes == [50, 40, 30, 20, 10]
+
+
+def test_merger_window():
+    from IntegraPy.merge import EventMerger
+
+    merger = EventMerger(window=timedelta(minutes=10))
+    merger.add_source('a')
+    merger.add_source('b')
+
+    merger.push('a', FakeEvent('a', 5))
+    merger.push('a', FakeEvent('a', 8))
+    # nothing known about b yet
+    assert merger.pop_ready() == []
+
+    merger.push('b', FakeEvent('b', 6))
+    assert [e.timestamp.minute for e in merger.pop_ready()] == [5, 6]
+
+    merger.push('a', FakeEvent('a', 30))
+    # b is silent, the window releases what is 10 minutes older
+    assert [e.timestamp.minute for e in merger.pop_ready()] == [8]
+
+    merger.push('b', FakeEvent('b', 7))
+    assert merger.late == 1
+    merger.advance('b', datetime(2020, 1, 1, 12, 40))
+    assert [e.timestamp.minute for e in merger.pop_ready()] == [7, 30]
+    assert len(merger) == 0
+
+
+def test_merged_stream(simulated_panel):
+    from IntegraPy.merge import MergedEventStream
+
+    panels = [simulated_panel() for n in range(2)]
+    stream = MergedEventStream(
+        [Integra(1234, *panel.server_address) for panel in panels],
+        backlog=2
+    )
+    subscription = stream.bus.subscribe()
+    assert stream.poll() == 4
+
+    panels[1].state.events += 1
+    assert stream.poll() == 1
+    events = subscription.get_batch()
+    assert [evt.integra.port for evt in events][-1] == \
+        panels[1].server_address[1]
+    timestamps = [evt.timestamp for evt in events]
+    assert timestamps == sorted(timestamps)
@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+from binascii import unhexlify
+
+from IntegraPy import Integra
+
+
+class CountingIntegra(Integra):
+    '''
+    Answers EE commands locally and counts them
+    '''
+    def __init__(self):
+        super(CountingIntegra, self).__init__(1234, '127.0.0.1')
+        self.commands = []
+
+    def run_command(self, cmd, deadline=None):
+        self.commands.append(cmd)
+        kind, number = bytearray(unhexlify(cmd[2:]))
+        return bytearray([kind, number, 0]) + b'Object %-9d' % number
+
+
+def test_resolve_names(make_event):
+    integra = CountingIntegra()
+    # 2/0: change of user access code
+    events = [
+        make_event(code=2, restore=0, source_number=number % 10)
+        for number in range(1000)
+    ]
+
+    assert events[0].source is None
+
+    integra.resolve_names(events)
+    # 10 distinct sources + 1 keypad
+    assert len(integra.commands) == 11
+    assert events[15].source == 'Object 5'
+    assert events[15].keypad == 'Object 140'
+
+    integra.resolve_names(events)
+    assert len(integra.commands) == 11
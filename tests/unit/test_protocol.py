@@ -0,0 +1,84 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+
+import pytest
+
+
+def test_protocol_split_frames():
+    from IntegraPy import prepare_frame
+    from IntegraPy.constants import BUSY
+    from IntegraPy.protocol import IntegraProtocol, Response, Busy, Error
+
+    protocol = IntegraProtocol()
+    first = protocol.send_command('00')
+    protocol.send_command('0A')
+    protocol.send_command('17')
+    assert protocol.pending == 3
+
+    data = BUSY + prepare_frame('0A01') + prepare_frame('0A02')
+    protocol.receive_data(data[:5])
+    assert protocol.next_event() is None
+    protocol.receive_data(data[5:12])
+
+    event = protocol.next_event()
+    assert isinstance(event, Busy)
+    assert event.command == first
+    assert protocol.next_event() is None
+
+    protocol.receive_data(data[12:])
+    event = protocol.next_event()
+    assert isinstance(event, Response)
+    assert event.data == b'\x01'
+
+    # a response to a wrong command
+    event = protocol.next_event()
+    assert isinstance(event, Error)
+    assert protocol.next_event() is None
+    assert protocol.pending == 0
+
+
+@pytest.fixture
+def panel(simulated_panel):
+    return simulated_panel(busy_rate=0.3)
+
+
+def test_threaded_transport(panel):
+    from IntegraPy import Integra
+    from IntegraPy.transport import ThreadedTransport
+
+    with ThreadedTransport(*panel.server_address, max_attempts=20) as trans:
+        integra = Integra(1234, *panel.server_address, transport=trans)
+        for _ in range(20):
+            assert integra.get_violated_zones() == set([1])
+
+
+def test_asyncio_transport(panel):
+    from IntegraPy.transport import AsyncioTransport
+
+    async def run():
+        trans = AsyncioTransport(*panel.server_address, max_attempts=20)
+        try:
+            return await asyncio.gather(*(
+                trans.execute('violated_zones') for _ in range(20)
+            ))
+        finally:
+            trans.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(run()) == [set([1])] * 20
+    finally:
+        loop.close()
+
+
+def test_transport_options_on_integra():
+    from IntegraPy import Integra
+    from IntegraPy.health import HealthRegistry
+
+    integra = Integra(1234, '127.0.0.1', delay=0.5, health=HealthRegistry())
+    assert (integra.delay, integra.max_attempts) == (0.5, 3)
+
+    integra.max_attempts = 10
+    integra.recorder = recorder = object()
+    assert integra.transport.transport.max_attempts == 10
+    assert integra.transport.transport.recorder is recorder
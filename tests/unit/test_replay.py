@@ -0,0 +1,49 @@
+# -*- coding: UTF-8 -*-
+from binascii import hexlify, unhexlify
+
+EVENT = b'\x7f\x98\x83\x13]\xa6\n\x02\x06h\xde\xff\xff\xff'
+
+
+def test_check_response():
+    import pytest
+    from IntegraPy import prepare_frame
+    from IntegraPy.framing import check_response
+
+    command = prepare_frame('7E')
+    assert check_response(command, prepare_frame('7E0102')) == b'\x01\x02'
+
+    with pytest.raises(Exception):
+        check_response(command, prepare_frame('1A0102'))
+    with pytest.raises(Exception):
+        check_response(command, prepare_frame('7E0102')[:-1])
+
+
+def test_replay(tmpdir):
+    from IntegraPy import prepare_frame
+    from IntegraPy.constants import BUSY
+    from IntegraPy.replay import FrameRecorder, FrameLog, REQUEST, RESPONSE
+
+    path = str(tmpdir.join('frames.ipyr'))
+    with FrameRecorder(path) as recorder:
+        command = prepare_frame('8CFFFFFF')
+        recorder.record(REQUEST, command, 1.0)
+        recorder.record(RESPONSE, BUSY, 1.1)
+        recorder.record(REQUEST, command, 2.0)
+        recorder.record(RESPONSE, prepare_frame(b'8C' + hexlify(EVENT)), 2.1)
+        recorder.record(REQUEST, prepare_frame('00'), 3.0)
+        recorder.record(RESPONSE, unhexlify('FEFE00FE0D'), 3.1)
+        # request left without a response
+        recorder.record(REQUEST, prepare_frame('00'), 4.0)
+
+    with FrameLog(path) as frames:
+        assert len(list(frames)) == 7
+
+        results = list(frames.replay())
+        assert len(results) == 2
+
+        timestamp, code, evt = results[0]
+        assert (timestamp, code) == (2.0, 0x8C)
+        assert evt.event_index == b'0668DE'
+
+        timestamp, code, exc = results[1]
+        assert isinstance(exc, Exception)
@@ -0,0 +1,102 @@
+# -*- coding: UTF-8 -*-
+from binascii import unhexlify
+
+from IntegraPy.commands import COMMANDS
+from IntegraPy.exceptions import IntegraConnectionError
+from IntegraPy.framing import bytes_with_bits_set
+
+
+class FakeIntegra(object):
+    host = 'panel'
+    port = 7094
+
+    def __init__(self):
+        self.state = {'violated_zones': [1], 'armed_partitions': []}
+        self.commands = []
+
+    def run_command(self, cmd):
+        code = bytearray(unhexlify(cmd))[0]
+        name = [n for n, c in COMMANDS.items() if c.code == code][0]
+        self.commands.append(name)
+        if self.state is None:
+            raise IntegraConnectionError('down')
+        return bytes_with_bits_set(self.state[name], 128)
+
+
+def test_adaptive_intervals():
+    from IntegraPy.scheduler import PollScheduler
+
+    integra = FakeIntegra()
+    changes = []
+    scheduler = PollScheduler(
+        min_interval=1, max_interval=8, budget=100, max_workers=1
+    )
+    scheduler.subscribe(changes.append)
+    scheduler.add(integra, ['zones'])
+
+    intervals = []
+    now = 0
+    for step in range(5):
+        scheduler.run_once(now)
+        intervals.append(scheduler._polls[0].interval)
+        now = scheduler._polls[0].due
+
+    # first poll is a change, then quiet polls back off up to the bound
+    assert intervals == [1, 2, 4, 8, 8]
+    assert [c.added for c in changes] == [[1]]
+
+    integra.state['violated_zones'] = [2]
+    scheduler.run_once(now)
+    assert scheduler._polls[0].interval == 1
+    assert changes[-1].added == [2] and changes[-1].removed == [1]
+
+    integra.state = None
+    scheduler.run_once(now + 1)
+    assert scheduler._polls[0].interval == 8
+
+
+def test_budget():
+    from IntegraPy.scheduler import PollScheduler
+
+    integra = FakeIntegra()
+    scheduler = PollScheduler(min_interval=0, budget=1, max_workers=1)
+    scheduler.add(integra, ['zones', 'partitions'])
+
+    scheduler.run_once(0)
+    assert len(integra.commands) == 1
+    scheduler.run_once(0.5)
+    assert len(integra.commands) == 1
+    scheduler.run_once(1.0)
+    assert len(integra.commands) == 2
+
+
+def test_publish_state(tmpdir):
+    from IntegraPy.scheduler import PollScheduler
+    from IntegraPy.sharedstate import StatePublisher, StateReader
+
+    path = str(tmpdir.join('panel.state'))
+    integra = FakeIntegra()
+    scheduler = PollScheduler(budget=100, max_workers=1)
+    with StatePublisher(path) as publisher:
+        scheduler.add(integra, ['zones', 'partitions'], publisher)
+        with StateReader(path) as reader:
+            sequence = reader.sequence
+            scheduler.run_once(0)
+            snapshot = reader.snapshot()
+
+    assert snapshot.sequence == sequence + 4
+    assert snapshot.violated_zones == {1}
+    assert snapshot.armed_partitions == set()
+
+
+def test_budget_below_one_command_per_second():
+    from IntegraPy.scheduler import PollScheduler
+
+    integra = FakeIntegra()
+    scheduler = PollScheduler(min_interval=0, budget=0.5, max_workers=1)
+    scheduler.add(integra, ['zones'])
+
+    for now in range(0, 10):
+        scheduler.run_once(now)
+    # one command every 2 seconds
+    assert len(integra.commands) == 5
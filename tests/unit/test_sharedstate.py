@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+from threading import Thread
+
+
+def test_snapshots_are_consistent(tmpdir):
+    from IntegraPy.framing import bytes_with_bits_set
+    from IntegraPy.sharedstate import StatePublisher, StateReader
+
+    path = str(tmpdir.join('panel.state'))
+    publisher = StatePublisher(path)
+    reader = StateReader(path)
+
+    def write():
+        for n in range(1, 2001):
+            bitmap = bytes_with_bits_set([n % 32 + 1], 32)
+            publisher.publish(zones=bitmap, partitions=bitmap, timestamp=n)
+
+    writer = Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        snapshot = reader.snapshot()
+        assert snapshot.sequence % 2 == 0
+        assert snapshot.zones[:4] == snapshot.partitions
+    writer.join()
+
+    snapshot = reader.snapshot()
+    assert snapshot.timestamp == 2000
+    assert snapshot.violated_zones == {2000 % 32 + 1}
+    reader.close()
+    publisher.close()
+
+    # a new publisher continues the sequence and keeps the state
+    with StatePublisher(path) as publisher, StateReader(path) as reader:
+        assert reader.sequence > snapshot.sequence
+        assert reader.snapshot().zones == snapshot.zones
+
+
+def test_dead_writer(tmpdir):
+    import pytest
+    from IntegraPy.exceptions import IntegraTimeout
+    from IntegraPy.sharedstate import (
+        StatePublisher, StateReader, SEQUENCE, SEQUENCE_OFFSET
+    )
+
+    path = str(tmpdir.join('panel.state'))
+    publisher = StatePublisher(path)
+    # the writer died in the middle of an update
+    SEQUENCE.pack_into(
+        publisher._map, SEQUENCE_OFFSET, publisher.sequence + 1
+    )
+    publisher.close()
+
+    with StateReader(path) as reader:
+        with pytest.raises(IntegraTimeout):
+            reader.snapshot(timeout=0.01)
+
+        # a new writer makes the segment readable again
+        with StatePublisher(path):
+            assert reader.snapshot().sequence % 2 == 0
+
+
+def test_state_path():
+    from IntegraPy.sharedstate import state_path
+
+    assert state_path('10.0.0.1', 7094, '/tmp') == \
+        '/tmp/integrapy-10.0.0.1-7094.state'
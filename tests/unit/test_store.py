@@ -0,0 +1,27 @@
+# -*- coding: UTF-8 -*-
+from datetime import date, datetime
+
+
+def test_event_store_query(make_event):
+    from IntegraPy.store import EventStore
+
+    store = EventStore(
+        make_event(idx, day=idx, partition=idx % 3, restore=0)
+        for idx in range(1, 31)
+    )
+    assert len(store) == 30
+    assert store.extend([make_event(5, day=5, partition=2, restore=0)]) == 0
+    assert store.get(b'000005').day == 5
+
+    found = store.query(
+        event_class='access control',
+        partition=0,
+        since=date(2017, 8, 7),
+        until=datetime(2017, 8, 22)
+    )
+    assert [evt.day for evt in found] == [21, 18, 15, 12, 9]
+
+    assert len(store.query(partition=1, limit=2)) == 2
+    assert store.query(event_class=0) == []
+    assert store.query(restore=True) == []
+    assert len(store.query()) == 30
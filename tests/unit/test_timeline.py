@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+from datetime import datetime
+
+
+def test_timeline_queries():
+    from IntegraPy.timeline import Timeline
+
+    timeline = Timeline()
+    for on, timestamp in [(1, 10), (1, 12), (0, 20), (1, 30), (0, 35),
+                          (1, 50)]:
+        timeline.set(on, timestamp)
+
+    # repeated states are not stored
+    assert list(timeline.transitions) == [10, 20, 30, 35, 50]
+    assert timeline.on
+    assert timeline.state_at(15) and not timeline.state_at(25)
+    assert timeline.duration(0, 100) == 10 + 5 + 50
+    assert timeline.duration(15, 32) == 5 + 2
+    assert timeline.duty_cycle(10, 20) == 1.0
+    assert timeline.count(10, 50) == 2
+    assert list(timeline.intervals(15, 60)) == [(15, 20), (30, 35), (50, 60)]
+
+
+def test_activity(tmpdir):
+    from IntegraPy import parse_event
+    from IntegraPy.scheduler import StateChange
+    from IntegraPy.timeline import ActivityTimeline
+
+    activity = ActivityTimeline()
+    activity.observe('zones', {1, 12}, 100)
+    activity.observe('zones', {12}, 160)
+    activity.add_change(StateChange(None, 'zones', {12}, set(), 400))
+    activity.observe('outputs', {3}, 100)
+
+    assert activity.durations('zones', 0, 1000) == {1: 60, 12: 300}
+    assert activity.duty_cycles('outputs', 100, 200) == {3: 1.0}
+
+    evt = parse_event(b'\x7f\x98\x83\x13]\xa6\n\x02\x06h\xde\xff\xff\xff')
+    evt.current_year = 2020
+    evt.code_high, evt.code_low, evt.restore = 0, 2, 0
+    # change of user access code has no end
+    assert not activity.add_event(evt)
+
+    # zone violation and restore
+    evt.code_high, evt.code_low, evt.source_number = 0, 99, 5
+    assert activity.add_event(evt)
+    evt.restore, evt.minutes_low = 1, evt.minutes_low + 2
+    activity.add_event(evt)
+    assert activity.durations('event 99', 0, 2e9) == {5: 120}
+
+    path = str(tmpdir.join('activity.ipyt'))
+    activity.save(path)
+    loaded = ActivityTimeline.load(path)
+    assert loaded.durations('zones', 0, 1000) == {1: 60, 12: 300}
+    assert loaded.timeline('outputs', 3).on
+    loaded.observe('outputs', set(), datetime.fromtimestamp(200))
+    assert loaded.durations('outputs', 0, 1000) == {3: 100}
+
+
+def test_events_newest_first(make_event):
+    from IntegraPy.timeline import ActivityTimeline, Timeline
+
+    # zone 5 violated at 13:07, restored at 13:17 and violated again and
+    # restored within 13:20, as read from the panel
+    events = [
+        make_event(index, code=99, source_number=5, restore=restore,
+                   minutes_low=minutes_low)
+        for index, restore, minutes_low in [
+            (4, 1, 32), (3, 0, 32), (2, 1, 29), (1, 0, 19)
+        ]
+    ]
+    activity = ActivityTimeline()
+    activity.extend(events)
+    assert activity.durations('event 99', 0, 2e9) == {5: 600}
+    assert not activity.timeline('event 99', 5).on
+
+    timeline = Timeline()
+    timeline.set(True, datetime(2020, 1, 1, 12))
+    assert timeline.duration(0, datetime(2020, 1, 1, 12, 1)) == 60
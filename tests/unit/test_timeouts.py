@@ -0,0 +1,125 @@
+# -*- coding: UTF-8 -*-
+import time
+import socket
+from threading import Timer
+
+import pytest
+
+
+@pytest.fixture
+def silent_panel():
+    '''
+    Accepts connections (in the backlog) but never answers
+    '''
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(5)
+    yield sock.getsockname()
+    sock.close()
+
+
+def test_read_timeout(silent_panel):
+    from IntegraPy import Integra, IntegraTimeout
+
+    integra = Integra(1234, *silent_panel, read_timeout=0.1)
+    started = time.monotonic()
+    with pytest.raises(IntegraTimeout):
+        integra.get_violated_zones()
+    assert time.monotonic() - started < 1
+
+
+def test_deadline_and_cancel(silent_panel):
+    from IntegraPy import Integra, Deadline, IntegraTimeout, IntegraCancelled
+
+    integra = Integra(1234, *silent_panel, timeout=0.1)
+    with pytest.raises(IntegraTimeout):
+        integra.get_violated_zones()
+
+    deadline = Deadline(10)
+    Timer(0.1, deadline.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(IntegraCancelled):
+        integra.execute('violated_zones', deadline=deadline)
+    assert time.monotonic() - started < 1
+
+
+def test_cancel_while_connecting():
+    from IntegraPy import Integra, Deadline, IntegraCancelled
+
+    # a full backlog leaves further connections pending
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(0)
+    pending = []
+    while True:
+        client = socket.socket()
+        client.settimeout(0.1)
+        try:
+            client.connect(sock.getsockname())
+        except socket.timeout:
+            client.close()
+            break
+        pending.append(client)
+
+    integra = Integra(1234, *sock.getsockname(), connect_timeout=10)
+    deadline = Deadline()
+    Timer(0.1, deadline.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(IntegraCancelled):
+        integra.execute('violated_zones', deadline=deadline)
+    assert time.monotonic() - started < 1
+
+    for client in pending:
+        client.close()
+    sock.close()
+
+
+def test_socket_closed_when_deadline_passes(silent_panel):
+    from IntegraPy import Deadline, IntegraTimeout, BlockingTransport
+
+    class ExpiringDeadline(Deadline):
+        '''
+        Passes once the socket is attached
+        '''
+        sockets = []
+
+        def attach(self, sock):
+            if sock is not None:
+                self.sockets.append(sock)
+            super(ExpiringDeadline, self).attach(sock)
+
+        def check(self):
+            if self.sockets:
+                raise IntegraTimeout('Command deadline exceeded')
+
+    with pytest.raises(IntegraTimeout):
+        BlockingTransport(*silent_panel)._open(ExpiringDeadline())
+    assert ExpiringDeadline.sockets[0].fileno() == -1
+
+
+def test_connection_refused():
+    from IntegraPy import Integra, IntegraConnectionError
+
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    with pytest.raises(IntegraConnectionError):
+        Integra(1234, '127.0.0.1', port).get_version()
+
+
+def test_typed_protocol_errors():
+    from IntegraPy import (
+        prepare_frame, ProtocolError, ChecksumError, ResultError
+    )
+    from IntegraPy.framing import check_response
+
+    command = prepare_frame('7E')
+    with pytest.raises(ProtocolError):
+        check_response(command, prepare_frame('1A0102'))
+    with pytest.raises(ChecksumError):
+        check_response(command, prepare_frame('7E0102')[:-3] + b'\x00\xFE\x0D')
+    with pytest.raises(ResultError) as exc:
+        check_response(command, prepare_frame('EF01'))
+    assert exc.value.code == 1